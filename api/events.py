@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Subscriber:
+    """One stream listener with its own bounded event queue"""
+
+    def __init__(self, robot_id: Optional[str], max_queue: int):
+        self.robot_id = robot_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return (
+            self.robot_id is None
+            or event.get("robot_id") is None
+            or event["robot_id"] == self.robot_id
+        )
+
+class EventBroker:
+    """In-process fan-out of telemetry and instruction events.
+
+    ``publish`` never waits on a subscriber: when a slow client's queue is
+    full its oldest event is dropped and counted, so the stream can tell the
+    client to resync instead of holding memory for it.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, robot_id: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(robot_id, self.max_queue)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, robot_id: Optional[str], data: Dict[str, Any]) -> None:
+        event = {"type": event_type, "robot_id": robot_id, "data": data}
+        for subscriber in self._subscribers:
+            if not subscriber.wants(event):
+                continue
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()
+                subscriber.dropped += 1
+            subscriber.queue.put_nowait(event)
+
+broker = EventBroker()
+
+class InstructionWaiters:
+    """Wakes long-polling robots when new instruction blocks are stored.
+
+    A waiter must be registered *before* the caller checks the database, so a
+    notify that lands between the check and the wait is not lost.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+
+    def register(self, robot_id: str) -> asyncio.Event:
+        waiter = asyncio.Event()
+        self._waiters.setdefault(robot_id, set()).add(waiter)
+        return waiter
+
+    def unregister(self, robot_id: str, waiter: asyncio.Event) -> None:
+        waiters = self._waiters.get(robot_id)
+        if waiters is None:
+            return
+        waiters.discard(waiter)
+        if not waiters:
+            del self._waiters[robot_id]
+
+    def notify(self, robot_id: str) -> None:
+        for waiter in self._waiters.get(robot_id, ()):
+            waiter.set()
+
+    async def wait(self, waiter: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+instruction_waiters = InstructionWaiters()
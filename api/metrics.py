@@ -0,0 +1,152 @@
+import math
+import time
+from typing import Dict, List, Tuple
+
+from database import Histogram, query_metrics, robot_registry
+
+# Time constant of the per-robot ingest rate (exponentially decayed average)
+INGEST_RATE_WINDOW_SECONDS = 60.0
+# Label for telemetry from ids missing from the robot registry, so clients
+# cannot add series by sending made-up robot ids
+UNKNOWN_ROBOT = "unknown"
+
+class RouteStats:
+    __slots__ = ("statuses", "latency")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram()
+
+class RobotIngest:
+    __slots__ = ("samples", "rate", "last_seen")
+
+    def __init__(self):
+        self.samples = 0
+        self.rate = 0.0        # samples/s, decayed as of last_seen
+        self.last_seen = 0.0   # time.monotonic()
+
+class ServerMetrics:
+    """Counters behind the /metrics endpoint.
+
+    Everything is updated from the event loop thread, so no locking is
+    needed; SQLite timings come from database.query_metrics, which worker
+    threads update under its own lock.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        self.robots: Dict[str, RobotIngest] = {}
+
+    def record_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.latency.observe(seconds)
+
+    def record_telemetry(self, robot_id: str, samples: int = 1) -> None:
+        if robot_id not in robot_registry:
+            robot_id = UNKNOWN_ROBOT
+        robot = self.robots.get(robot_id)
+        if robot is None:
+            robot = self.robots[robot_id] = RobotIngest()
+        now = time.monotonic()
+        robot.rate = _decayed(robot.rate, now - robot.last_seen) + samples / INGEST_RATE_WINDOW_SECONDS
+        robot.samples += samples
+        robot.last_seen = now
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        now = time.monotonic()
+
+        lines += ["# HELP http_requests_total HTTP requests by route and status code.",
+                  "# TYPE http_requests_total counter"]
+        for (method, route), stats in self.routes.items():
+            for status, count in stats.statuses.items():
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+
+        lines += ["# HELP http_requests_in_flight HTTP requests currently being served.",
+                  "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {self.in_flight}"]
+
+        lines += ["# HELP http_request_duration_seconds HTTP request latency by route.",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), stats in self.routes.items():
+            _histogram_lines(lines, "http_request_duration_seconds",
+                             f'method="{method}",route="{_escape(route)}"', stats.latency)
+
+        lines += ["# HELP sqlite_query_duration_seconds Time spent executing SQLite statements by type.",
+                  "# TYPE sqlite_query_duration_seconds histogram"]
+        for kind, histogram in sorted(query_metrics.histograms.items()):
+            _histogram_lines(lines, "sqlite_query_duration_seconds", f'statement="{kind}"', histogram)
+
+        lines += ["# HELP robot_telemetry_samples_total Telemetry samples ingested per robot.",
+                  "# TYPE robot_telemetry_samples_total counter"]
+        lines += [f'robot_telemetry_samples_total{{robot_id="{_escape(robot_id)}"}} {robot.samples}'
+                  for robot_id, robot in self.robots.items()]
+
+        lines += [f"# HELP robot_telemetry_rate Telemetry samples per second per robot, "
+                  f"averaged over ~{INGEST_RATE_WINDOW_SECONDS:g}s.",
+                  "# TYPE robot_telemetry_rate gauge"]
+        lines += [f'robot_telemetry_rate{{robot_id="{_escape(robot_id)}"}} '
+                  f'{_decayed(robot.rate, now - robot.last_seen):.6g}'
+                  for robot_id, robot in self.robots.items()]
+
+        lines += ["# HELP robot_last_seen_age_seconds Seconds since the robot last sent telemetry.",
+                  "# TYPE robot_last_seen_age_seconds gauge"]
+        lines += [f'robot_last_seen_age_seconds{{robot_id="{_escape(robot_id)}"}} '
+                  f'{now - robot.last_seen:.3f}'
+                  for robot_id, robot in self.robots.items()]
+        return "\n".join(lines) + "\n"
+
+metrics = ServerMetrics()
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request into ``metrics``.
+
+    Requests are labelled with the matched route template (``/telemetry/{robot_id}``),
+    or the mount path for static files, so label sets stay bounded.
+    """
+
+    def __init__(self, app, metrics: ServerMetrics = metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            path = route.path if route is not None else scope.get("root_path") or "unmatched"
+            metrics.record_request(scope["method"], path, status, time.perf_counter() - start)
+
+def _decayed(rate: float, elapsed: float) -> float:
+    return rate * math.exp(-elapsed / INGEST_RATE_WINDOW_SECONDS) if rate else 0.0
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    for bound, count in zip(histogram.bounds, histogram.cumulative()):
+        lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
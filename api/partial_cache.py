@@ -0,0 +1,49 @@
+import hashlib
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+class PartialCache:
+    """Bounded LRU cache of rendered dashboard partials.
+
+    Entries are keyed by the partial name plus the data versions it was
+    rendered from, so a changed table simply produces a new key and stale
+    entries age out. Each entry carries a strong ETag derived from the
+    rendered bytes.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> Tuple[str, bytes]:
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._entries[key] = (etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag, body
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison, per RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,153 @@
+"""Mission route planning on the line ring.
+
+The track is a ring of ``RING_LINES`` numbered lines and a block id is the
+line it sits on. Each block is picked up and then dropped at a station
+before the next one (the gripper holds a single block). The planner picks
+the block order, the station for each block and the direction of every
+leg so that the total number of lines crossed is minimal.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+RING_LINES = 10
+START_LINE = 1
+CLOCKWISE = "clockwise"              # increasing line numbers (sens_horaire)
+COUNTERCLOCKWISE = "counterclockwise"
+
+def _station_lines() -> Dict[str, int]:
+    lines = os.getenv("ROUTE_STATION_LINES", "4,8").split(",")
+    return {f"Station {i}": int(line) for i, line in enumerate(lines, start=1)}
+
+# Line of each drop-off station, e.g. ROUTE_STATION_LINES="4,8"
+STATION_LINES = _station_lines()
+# Stations each block may be dropped at, as in the simulator's Robot.choisirStation;
+# blocks not listed may go to any station
+BLOCK_STATIONS: Dict[int, Tuple[str, ...]] = {
+    2: ("Station 1", "Station 2"),
+    3: ("Station 1",),
+    6: ("Station 1",),
+    7: ("Station 2",),
+    10: ("Station 2",),
+}
+# Rough travel time per line crossed, for the plan's time estimate
+SECONDS_PER_LINE = float(os.getenv("ROUTE_SECONDS_PER_LINE", "2.0"))
+# Above this many blocks the exact search (a few ms at 8) gives way to a greedy one
+MAX_EXACT_BLOCKS = 8
+
+def leg(from_line: int, to_line: int) -> Tuple[int, str]:
+    """Lines to cross and direction of the shorter way round (clockwise on ties)"""
+    forward = (to_line - from_line) % RING_LINES
+    backward = (from_line - to_line) % RING_LINES
+    if forward <= backward:
+        return forward, CLOCKWISE
+    return backward, COUNTERCLOCKWISE
+
+def _stations_for(block: int) -> Tuple[str, ...]:
+    stations = BLOCK_STATIONS.get(block, tuple(STATION_LINES))
+    return tuple(s for s in stations if s in STATION_LINES) or tuple(STATION_LINES)
+
+def _job_cost(position: int, block: int, station: str) -> int:
+    return leg(position, block)[0] + leg(block, STATION_LINES[station])[0]
+
+def _exact_order(blocks: Sequence[int], start_line: int) -> List[Tuple[int, str]]:
+    """Held-Karp search over (blocks done, current line)"""
+    n = len(blocks)
+    options = [_stations_for(block) for block in blocks]
+    # layers[mask][line] = (cost, previous mask, previous line, block index, station)
+    layers: List[Dict[int, tuple]] = [dict() for _ in range(1 << n)]
+    layers[0][start_line] = (0, None, None, None, None)
+    for mask in range(1 << n):
+        for position, state in layers[mask].items():
+            cost = state[0]
+            for i in range(n):
+                if mask & (1 << i):
+                    continue
+                following = layers[mask | (1 << i)]
+                for station in options[i]:
+                    total = cost + _job_cost(position, blocks[i], station)
+                    line = STATION_LINES[station]
+                    if line not in following or total < following[line][0]:
+                        following[line] = (total, mask, position, i, station)
+
+    mask = (1 << n) - 1
+    position = min(layers[mask], key=lambda line: layers[mask][line][0])
+    order = []
+    while mask:
+        _, previous_mask, previous_line, index, station = layers[mask][position]
+        order.append((index, station))
+        mask, position = previous_mask, previous_line
+    order.reverse()
+    return order
+
+def _greedy_order(blocks: Sequence[int], start_line: int) -> List[Tuple[int, str]]:
+    """Repeatedly take the cheapest remaining pickup and drop-off"""
+    remaining = list(range(len(blocks)))
+    position, order = start_line, []
+    while remaining:
+        _, index, station = min(
+            (_job_cost(position, blocks[i], station), i, station)
+            for i in remaining for station in _stations_for(blocks[i])
+        )
+        remaining.remove(index)
+        order.append((index, station))
+        position = STATION_LINES[station]
+    return order
+
+def _clockwise_cost(blocks: Sequence[int], start_line: int) -> int:
+    """Lines crossed doing the blocks as given, always clockwise, at their first station"""
+    position, total = start_line, 0
+    for block in blocks:
+        station_line = STATION_LINES[_stations_for(block)[0]]
+        total += (block - position) % RING_LINES + (station_line - block) % RING_LINES
+        position = station_line
+    return total
+
+def _as_line(value: Any) -> Optional[int]:
+    try:
+        line = int(value)
+    except (TypeError, ValueError):
+        return None
+    return line if 1 <= line <= RING_LINES else None
+
+def plan_route(blocks: Sequence[int], start_line: Any = None) -> Dict[str, Any]:
+    """Best pickup order, drop-off stations and leg directions for ``blocks``.
+
+    ``start_line`` is the robot's last reported line (telemetry stores it as
+    text); anything that is not a line of the ring means START_LINE.
+    Raises ValueError for a block that is not a line of the ring.
+    """
+    for block in blocks:
+        if _as_line(block) != block:
+            raise ValueError(f"Block {block} is not on the ring (lines 1-{RING_LINES})")
+    start_line = _as_line(start_line) or START_LINE
+
+    if len(blocks) <= MAX_EXACT_BLOCKS:
+        order = _exact_order(blocks, start_line) if blocks else []
+    else:
+        order = _greedy_order(blocks, start_line)
+
+    legs, position = [], start_line
+    for index, station in order:
+        block = blocks[index]
+        for action, target, line in (("pickup", block, block),
+                                     ("drop", station, STATION_LINES[station])):
+            lines, direction = leg(position, line)
+            legs.append({
+                "action": action,
+                "target": target,
+                "from_line": position,
+                "to_line": line,
+                "direction": direction,
+                "lines": lines,
+            })
+            position = line
+
+    total = sum(step["lines"] for step in legs)
+    return {
+        "start_line": start_line,
+        "order": [blocks[index] for index, _ in order],
+        "legs": legs,
+        "total_lines": total,
+        "unoptimized_lines": _clockwise_cost(blocks, start_line),
+        "estimated_seconds": round(total * SECONDS_PER_LINE, 1),
+    }
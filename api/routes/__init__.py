@@ -1,21 +1,116 @@
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import APIRouter, Request, Response, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from database import (
-    get_all_robots,
-    insert_robot,
-    insert_instruction,
-    get_robot_instructions,
-    DB_PATH
-)
-from ..models.schemas import RobotIn, InstructionIn, SummaryIn
-import sqlite3
+from pydantic import ValidationError
+from database import aio, robot_registry, telemetry_buffer, telemetry_retention, query_profiler, BufferFullError
+from ..models.schemas import RobotIn, InstructionIn, TelemetryIn, SummaryIn
+from ..events import broker, instruction_waiters
+from ..metrics import metrics
+from ..partial_cache import PartialCache, etag_matches
+from ..route_planner import plan_route
+from ..telemetry_format import TelemetryFormatError, decode_records
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 templates = Jinja2Templates(directory="templates")
 api_router = APIRouter()
 
+SSE_KEEPALIVE_SECONDS = 15
+MAX_LONG_POLL_SECONDS = 60
+# Latest telemetry rows shown per robot on the dashboard
+TELEMETRY_PANEL_ROWS = int(os.getenv("TELEMETRY_PANEL_ROWS", "20"))
+# Instructions shown on the first page of the history panel
+HISTORY_PAGE_ROWS = int(os.getenv("HISTORY_PAGE_ROWS", "50"))
+
+# Data versions (see aio.get_data_versions) each partial is rendered from;
+# partials not listed here are static templates
+PARTIAL_SOURCES = {
+    "active": ("robots", "instructions"),
+    "history": ("robots", "instructions"),
+    "telemetry": ("robots", "telemetry_min", "telemetry_max"),
+    "summary": ("robots", "summary"),
+}
+partial_cache = PartialCache(max_entries=int(os.getenv("PARTIAL_CACHE_SIZE", "64")))
+
+def _utc_timestamp() -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def _sql_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a query datetime like stored timestamps; naive values are taken as UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+async def _stream_page(items: AsyncIterator[Dict[str, Any]], limit: int) -> StreamingResponse:
+    """Stream a keyset page as ``{"items": [...], "next_cursor": id}``.
+
+    ``next_cursor`` is the id to pass back as ``before_id``/``after_id`` for the
+    following page, or null once a short page shows there is nothing left.
+    The first row is read before the response starts, so a failing query
+    still gets a 500 instead of a truncated 200.
+    """
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield '{"items":['
+        if first is None:
+            yield '],"next_cursor":null}'
+            return
+        yield json.dumps(first)
+        count, last_id = 1, first["id"]
+        try:
+            async for item in items:
+                yield "," + json.dumps(item)
+                count += 1
+                last_id = item["id"]
+        except Exception as e:
+            # Too late for an error status; abort rather than end the JSON
+            logger.error(f"Error streaming page after {count} items: {e}")
+            raise
+        yield f'],"next_cursor":{json.dumps(last_id if count == limit else None)}}}'
+
+    return StreamingResponse(body(), media_type="application/json")
+
+def _publish_telemetry(robot_id: str, speed: float, distance: float, status: str,
+                       line: int, gripper: str, time_stamp: Optional[str] = None) -> None:
+    broker.publish("telemetry", robot_id, {
+        "speed": speed,
+        "ultrasonic_distance": distance,
+        "displacement_status": status,
+        "current_line": line,
+        "gripper_state": gripper,
+        "time_stamp": time_stamp or _utc_timestamp()
+    })
+
+@api_router.on_event("startup")
+async def load_robot_registry():
+    await aio.refresh_robot_registry()
+
+@api_router.on_event("startup")
+async def start_telemetry_buffer():
+    telemetry_buffer.start()
+    telemetry_retention.start()
+
+@api_router.on_event("shutdown")
+async def flush_telemetry_buffer():
+    telemetry_retention.stop()
+    telemetry_buffer.stop()
+    await aio.db_handler.close_all()
+    aio.db_handler.writer.stop()
+
 # Web Routes
 @api_router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -23,84 +118,114 @@ async def index(request: Request):
 
 @api_router.get("/partials/{partial_name}", response_class=HTMLResponse)
 async def get_partial(request: Request, partial_name: str):
+    """Serve a dashboard panel, re-rendering it only when its data changed"""
+    sources = PARTIAL_SOURCES.get(partial_name, ())
+    key = (partial_name,)
+    if sources:
+        versions = await aio.get_data_versions()
+        key += tuple(versions.get(source) for source in sources)
+
+    cached = partial_cache.get(key)
+    if cached is None:
+        cached = partial_cache.put(key, await _render_partial(request, partial_name))
+    etag, body = cached
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+async def _render_partial(request: Request, partial_name: str) -> bytes:
     context = {"request": request}
     
     if partial_name == "active":
-        robots = get_all_robots()
-        instructions = {r["id"]: get_robot_instructions(r["id"]) or ["None"] for r in robots}
+        robots, blocks = await aio.get_robots_with_instructions()
+        instructions = {rid: b or ["None"] for rid, b in blocks.items()}
         context.update({"robots": robots, "instructions": instructions})
     
     elif partial_name == "history":
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT i.robot_id, r.name, i.blocks, i.is_completed 
-            FROM instructions i
-            JOIN robots r ON i.robot_id = r.id 
-            ORDER BY i.id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
-        context["history"] = [
-            {
-                "robot_id": r[0],
-                "robot_name": r[1],
-                "blocks": [int(x) for x in r[2].split(",")],
-                "is_completed": bool(r[3])
-            }
-            for r in rows
-        ]
+        history = [h async for h in aio.iter_instruction_history(limit=HISTORY_PAGE_ROWS)]
+        context.update({"history": history, "page_size": HISTORY_PAGE_ROWS})
     
     elif partial_name == "telemetry":
-        robots = get_all_robots()
-        telemetry = {}
-        for r in robots:
-            rid = r["id"]
-            conn = sqlite3.connect(DB_PATH)
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT speed, ultrasonic_distance, current_line, gripper_state, time_stamp
-                FROM telemetry WHERE robot_id=? ORDER BY id DESC
-            """, (rid,))
-            rows = cur.fetchall()
-            conn.close()
-            telemetry[rid] = [
-                {"speed": s, "ultrasonic_distance": d, "current_line": l,
-                 "gripper_state": g, "time_stamp": t}
-                for s, d, l, g, t in rows
-            ]
-        context.update({"robots": robots, "telemetry": telemetry})
+        robots, telemetry = await aio.get_robots_with_telemetry(TELEMETRY_PANEL_ROWS)
+        context.update({"robots": robots, "telemetry": telemetry, "page_size": TELEMETRY_PANEL_ROWS})
     
     elif partial_name == "summary":
-        robots = get_all_robots()
-        summary = {}
-        for r in robots:
-            rid = r["id"]
-            conn = sqlite3.connect(DB_PATH)
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT timestamp FROM summary 
-                WHERE robot_id = ? ORDER BY id DESC LIMIT 1
-            """, (rid,))
-            rows = cur.fetchall()
-            conn.close()
-            summary[rid] = [{"time_stamp": t[0]} for t in rows]
+        robots, summary = await aio.get_robots_with_summary()
         context.update({"robots": robots, "summary": summary})
     
     elif partial_name == "robots":
-        return templates.TemplateResponse("partials/robots_add.html", context)
+        partial_name = "robots_add"
+
+    return templates.get_template(f"partials/{partial_name}.html").render(context).encode()
+
+# Event stream
+@api_router.get("/events")
+async def stream_events(robot_id: Optional[str] = None):
+    """Server-Sent Events feed of telemetry, instruction and summary changes"""
+    subscriber = broker.subscribe(robot_id)
+
+    async def event_stream():
+        try:
+            while True:
+                if subscriber.dropped:
+                    # Client fell behind; tell it to reload instead of replaying
+                    subscriber.dropped = 0
+                    yield "event: resync\ndata: {}\n\n"
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    return templates.TemplateResponse(f"partials/{partial_name}.html", context)
+# Monitoring
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Prometheus-style request, SQLite and telemetry ingest metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/debug/queries")
+async def read_query_profile(limit: int = Query(50, ge=1, le=500)):
+    """Statements seen by the SQL profiler, most expensive first (SQL_PROFILER=1)"""
+    return {"enabled": query_profiler.enabled, "statements": query_profiler.snapshot()[:limit]}
+
+@api_router.delete("/debug/queries")
+async def reset_query_profile():
+    query_profiler.reset()
+    return {"status": "ok"}
 
 # Robot Routes
 @api_router.get("/robots/list")
-async def list_robots():
+async def list_robots(response: Response):
     try:
-        return get_all_robots()
+        robots = await aio.get_all_robots()
+        response.headers["X-Robots-Version"] = str(robot_registry.version)
+        return robots
     except Exception as e:
         logger.error(f"Error listing robots: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/robots/{robot_id}/slot")
+async def read_robot_slot(robot_id: str):
+    """Numeric slot a robot uses in binary telemetry records"""
+    slot = robot_registry.slot_for(robot_id)
+    if slot is None:
+        await aio.refresh_robot_registry()
+        slot = robot_registry.slot_for(robot_id)
+        if slot is None:
+            raise HTTPException(status_code=404, detail="Robot not found")
+    return {"robot_id": robot_id, "slot": slot}
+
 @api_router.post("/robots")
 async def create_robot(request: Request):
     try:
@@ -109,7 +234,7 @@ async def create_robot(request: Request):
         name = form.get("name")
         if not robot_id or not name:
             raise HTTPException(status_code=400, detail="Robot ID and name required")
-        insert_robot(robot_id, name)
+        await aio.insert_robot(robot_id, name)
         return RedirectResponse(url="/", status_code=303)
     except Exception as e:
         logger.error(f"Error creating robot: {e}")
@@ -119,42 +244,86 @@ async def create_robot(request: Request):
 @api_router.post("/instructions/create")
 async def create_instruction(inst: InstructionIn):
     try:
-        insert_instruction(inst.robot_id, inst.blocks)
+        await aio.insert_instruction(inst.robot_id, inst.blocks)
+        broker.publish("instruction", inst.robot_id, {"blocks": inst.blocks})
+        instruction_waiters.notify(inst.robot_id)
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/instructions")
-async def read_instruction(robot_id: str):
+async def read_instruction(robot_id: str,
+                           wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS),
+                           plan: bool = False):
+    """Return the robot's pending blocks.
+
+    With ``wait`` > 0 and nothing pending, hold the request for up to that
+    many seconds until new instructions are created for this robot.
+    With ``plan``, the blocks come back in the order of the shortest route
+    from the robot's last reported line, along with that route.
+    """
     if not robot_id:
         raise HTTPException(status_code=400, detail="Robot ID required")
+    waiter = instruction_waiters.register(robot_id) if wait else None
     try:
-        return {"blocks": get_robot_instructions(robot_id) or []}
+        blocks = await aio.get_robot_instructions(robot_id)
+        if not blocks and waiter and await instruction_waiters.wait(waiter, wait):
+            blocks = await aio.get_robot_instructions(robot_id)
+        if plan and blocks:
+            telemetry = await aio.get_robot_telemetry(robot_id)
+            # Off the event loop: long block lists take a while to plan
+            route = await asyncio.to_thread(
+                plan_route, blocks, telemetry["current_line"] if telemetry else None
+            )
+            return {"blocks": route["order"], "plan": route}
+        return {"blocks": blocks or []}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if waiter:
+            instruction_waiters.unregister(robot_id, waiter)
+
+@api_router.get("/instructions/pending")
+async def read_pending_block(block_id: int):
+    """Robots that still have ``block_id`` in a pending instruction"""
+    try:
+        return {"block_id": block_id, "robots": await aio.get_robots_pending_block(block_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/instructions/history")
+async def read_instruction_history(robot_id: Optional[str] = None,
+                                   before_id: Optional[int] = None,
+                                   after_id: Optional[int] = None,
+                                   completed: Optional[bool] = None,
+                                   limit: int = Query(50, ge=1, le=1000)):
+    """Page through instructions by id, newest first unless after_id is given"""
+    return await _stream_page(
+        aio.iter_instruction_history(robot_id, after_id, before_id, completed, limit), limit
+    )
 
 # Remove the existing reset endpoints and replace with a single one
 @api_router.post("/reset")
 async def reset_instructions(robot_id: str = None):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        if robot_id:
-            # Reset for specific robot
-            cur.execute("""
-                DELETE FROM instructions 
-                WHERE robot_id = ? AND is_completed = 0
-            """, (robot_id,))
-        else:
-            # Reset all robots
-            cur.execute("DELETE FROM instructions WHERE is_completed = 0")
-        
-        affected = cur.rowcount
-        conn.commit()
-        conn.close()
+        def delete_pending(conn):
+            if robot_id:
+                # Reset for specific robot
+                cur = conn.execute("""
+                    DELETE FROM instructions 
+                    WHERE robot_id = ? AND is_completed = 0
+                """, (robot_id,))
+            else:
+                # Reset all robots
+                cur = conn.execute("DELETE FROM instructions WHERE is_completed = 0")
+            return cur.rowcount
+
+        affected = await aio.db_handler.write(delete_pending)
         
         logger.info(f"Deleted {affected} instructions" + (f" for robot {robot_id}" if robot_id else ""))
+        broker.publish("instruction", robot_id, {"blocks": None})
         
         # If called from web form, redirect back to history
         if not robot_id:
@@ -181,20 +350,91 @@ async def update_telemetry(request: Request):
     for f in required:
         if f not in data:
             raise HTTPException(status_code=400, detail=f"Missing field: {f}")
+    # Rows are written later by the buffer, so a bad value has to be caught here
+    try:
+        t = TelemetryIn(**data)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute(
-            """INSERT INTO telemetry 
-               (robot_id, speed, ultrasonic_distance, displacement_status, 
-                current_line, gripper_state)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (data["robot_id"], data["vitesse"], data["distance_ultrasons"],
-             data["statut_deplacement"], data["ligne"], data["statut_pince"])
+        telemetry_buffer.add(
+            (t.robot_id, t.vitesse, t.distance_ultrasons,
+             t.statut_deplacement, t.ligne, t.statut_pince, None)
         )
-        conn.commit()
-        conn.close()
+        metrics.record_telemetry(t.robot_id)
+        _publish_telemetry(t.robot_id, t.vitesse, t.distance_ultrasons,
+                           t.statut_deplacement, t.ligne, t.statut_pince)
         return {"status": "ok"}
+    except BufferFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/telemetry/batch")
+async def update_telemetry_batch(samples: List[TelemetryIn]):
+    try:
+        inserted = await aio.insert_telemetry_batch([
+            (t.robot_id, t.vitesse, t.distance_ultrasons,
+             t.statut_deplacement, t.ligne, t.statut_pince, None)
+            for t in samples
+        ])
+        for t in samples:
+            metrics.record_telemetry(t.robot_id)
+            _publish_telemetry(t.robot_id, t.vitesse, t.distance_ultrasons,
+                               t.statut_deplacement, t.ligne, t.statut_pince)
+        return {"status": "ok", "inserted": inserted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/telemetry/packed")
+async def update_telemetry_packed(request: Request):
+    """Ingest binary telemetry records (see api/telemetry_format.py)"""
+    body = await request.body()
+    received_at = datetime.now(timezone.utc)
+    try:
+        rows = []
+        for slot, row in decode_records(body, received_at):
+            robot_id = robot_registry.robot_for_slot(slot)
+            if robot_id is None:
+                # Robot may have been added by another process since the last load
+                await aio.refresh_robot_registry()
+                robot_id = robot_registry.robot_for_slot(slot)
+                if robot_id is None:
+                    raise HTTPException(status_code=400, detail=f"Unknown robot slot: {slot}")
+            rows.append((robot_id,) + row)
+    except TelemetryFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        telemetry_buffer.add_many(rows)
+        for row in rows:
+            metrics.record_telemetry(row[0])
+            _publish_telemetry(*row)
+        return {"status": "ok", "accepted": len(rows)}
+    except BufferFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/telemetry/{robot_id}")
+async def read_telemetry(robot_id: str,
+                         after_id: Optional[int] = None,
+                         before_id: Optional[int] = None,
+                         since: Optional[datetime] = None,
+                         until: Optional[datetime] = None,
+                         limit: int = Query(100, ge=1, le=1000)):
+    """Page through a robot's telemetry by id, newest first unless after_id is given"""
+    return await _stream_page(aio.iter_telemetry_page(
+        robot_id, after_id, before_id, _sql_timestamp(since), _sql_timestamp(until), limit
+    ), limit)
+
+@api_router.get("/telemetry/{robot_id}/rollups")
+async def read_telemetry_rollups(robot_id: str,
+                                 resolution: str = Query("minute", pattern="^(minute|hour)$"),
+                                 limit: int = Query(60, ge=1, le=1000)):
+    try:
+        return await aio.get_telemetry_rollups(robot_id, resolution, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -202,24 +442,30 @@ async def update_telemetry(request: Request):
 @api_router.post("/summary")
 async def create_summary(summary: SummaryIn):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Find and mark earliest uncompleted instruction
-        cur.execute("""
-            SELECT id FROM instructions
-            WHERE robot_id = ? AND is_completed = 0
-            ORDER BY id ASC LIMIT 1
-        """, (summary.robot_id,))
-        row = cur.fetchone()
+        def complete_instruction(conn):
+            # Find and mark earliest uncompleted instruction
+            row = conn.execute("""
+                SELECT id FROM instructions
+                WHERE robot_id = ? AND is_completed = 0
+                ORDER BY id ASC LIMIT 1
+            """, (summary.robot_id,)).fetchone()
 
-        if row:
-            cur.execute("UPDATE instructions SET is_completed = 1 WHERE id = ?", (row[0],))
+            if row:
+                conn.execute("UPDATE instructions SET is_completed = 1 WHERE id = ?", (row[0],))
 
-        # Insert summary timestamp
-        cur.execute("INSERT INTO summary (robot_id) VALUES (?)", (summary.robot_id,))
-        conn.commit()
-        conn.close()
+            # Insert summary timestamp
+            conn.execute(
+                "INSERT INTO summary (robot_id, average_speed) VALUES (?, ?)",
+                (summary.robot_id, summary.average_speed)
+            )
+            return row
+
+        row = await aio.db_handler.write(complete_instruction)
+
+        if row:
+            blocks = await aio.get_robot_instructions(summary.robot_id)
+            broker.publish("instruction", summary.robot_id, {"blocks": blocks})
+        broker.publish("summary", summary.robot_id, {"time_stamp": _utc_timestamp()})
         return {"status": "ok", "instruction_completed": bool(row)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""Fixed-layout binary telemetry, as sent by esp32/telemetrie.py.
+
+A body is one header followed by any number of records, all little-endian:
+
+    header  <2sBxI   magic b"TL", format version, pad, sender ticks_ms now
+    record  <HBBhHI  robot slot, line, flags, speed x100, distance mm, ticks_ms
+
+The robot slot is the robot's permanent ``slot`` number, at most 65535 (see
+``GET /robots/{id}/slot``), so records stay 12 bytes instead of carrying a
+36-character id. Timestamps are
+MicroPython ``ticks_ms`` values; the sender's current ticks in the header let
+the server turn each one into wall-clock time without a synchronized clock.
+"""
+import struct
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+MAGIC = b"TL"
+VERSION = 1
+HEADER = struct.Struct("<2sBxI")
+RECORD = struct.Struct("<HBBhHI")
+
+FLAG_MOVING = 0x01
+FLAG_GRIPPER_CLOSED = 0x02
+
+NO_DISTANCE = 0xFFFF
+# MicroPython's ticks_ms wraps at 2**30 on the ESP32 port
+TICKS_PERIOD = 1 << 30
+
+class TelemetryFormatError(ValueError):
+    pass
+
+def decode_records(body: bytes, received_at: datetime) -> Iterator[Tuple[int, tuple]]:
+    """Yield ``(slot, row)`` for every record in ``body``.
+
+    ``row`` has the telemetry buffer layout minus the robot id: (speed,
+    distance, displacement_status, line, gripper, time_stamp). Records are
+    unpacked straight from a memoryview of the body, without copying it.
+    """
+    view = memoryview(body)
+    if len(view) < HEADER.size:
+        raise TelemetryFormatError("Body shorter than the telemetry header")
+    magic, version, sender_now = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise TelemetryFormatError(f"Unsupported telemetry format {magic!r} v{version}")
+    records = view[HEADER.size:]
+    if len(records) % RECORD.size:
+        raise TelemetryFormatError(
+            f"Record data is {len(records)} bytes, not a multiple of {RECORD.size}"
+        )
+
+    for slot, line, flags, speed, distance, ticks in RECORD.iter_unpack(records):
+        age_ms = (sender_now - ticks) % TICKS_PERIOD
+        yield slot, (
+            speed / 100,
+            -1.0 if distance == NO_DISTANCE else distance / 10,
+            "MOVING" if flags & FLAG_MOVING else "STOP",
+            line,
+            "closed" if flags & FLAG_GRIPPER_CLOSED else "open",
+            (received_at - timedelta(milliseconds=age_ms)).strftime("%Y-%m-%d %H:%M:%S"),
+        )
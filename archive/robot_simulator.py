@@ -12,15 +12,19 @@ class RobotSimulator:
         self.speeds = []
         self.blocks = []
 
-    def wait_for_instruction(self, poll_interval=5):
-        """Poll /instructions until we receive a non-empty blocks list."""
+    def wait_for_instruction(self, poll_interval=5, long_poll=30):
+        """Long-poll /instructions until we receive a non-empty blocks list.
+
+        The server holds each request for up to ``long_poll`` seconds; set it to
+        0 to fall back to plain polling every ``poll_interval`` seconds.
+        """
         print(f"[{datetime.now().isoformat()}] Waiting for instructions for {self.robot_id}...")
         while True:
             try:
                 resp = requests.get(
                     f"{self.base_url}/instructions",
-                    params={"robot_id": self.robot_id},
-                    timeout=3
+                    params={"robot_id": self.robot_id, "wait": long_poll},
+                    timeout=long_poll + 3
                 )
                 resp.raise_for_status()
                 data = resp.json()
@@ -29,7 +33,7 @@ class RobotSimulator:
                     self.blocks = blocks
                     print(f"[{datetime.now().isoformat()}] Received instruction blocks: {blocks}")
                     return
-                else:
+                elif not long_poll:
                     # No instruction yet
                     time.sleep(poll_interval)
             except requests.RequestException as e:
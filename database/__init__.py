@@ -1,58 +1,104 @@
-from .db_handler import DatabaseHandler
-from .base_model import BaseModel
-from .db_init import init_db, DB_PATH
+from .db_handler import DatabaseHandler, QueryProfiler
+from .async_db_handler import AsyncDatabaseHandler
+from .base_model import BaseModel, AsyncBaseModel
+from .db_init import init_db, DB_PATH, DB_PROFILE
+from .db_writer import DatabaseWriter, PRAGMA_PROFILES, get_pragmas
 from .models import Robot, Instruction, Telemetry, Summary
+from .telemetry_buffer import TelemetryBuffer, BufferFullError
+from .retention import TelemetryRetention, ROLLUP_TABLES, format_rollup
+from .robot_registry import RobotRegistry, robot_registry
+from .query_metrics import Histogram, LATENCY_BUCKETS, query_metrics
+from . import aio
 from typing import List, Optional, Dict, Any
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 __all__ = [
     'DatabaseHandler',
+    'QueryProfiler',
+    'query_profiler',
+    'AsyncDatabaseHandler',
     'BaseModel',
+    'AsyncBaseModel',
+    'aio',
     'init_db',
     'DB_PATH',
+    'DB_PROFILE',
+    'DatabaseWriter',
+    'PRAGMA_PROFILES',
+    'db_handler',
     'Robot',
     'Instruction',
     'Telemetry',
     'Summary',
+    'TelemetryBuffer',
+    'BufferFullError',
+    'telemetry_buffer',
+    'TelemetryRetention',
+    'telemetry_retention',
+    'RobotRegistry',
+    'robot_registry',
+    'Histogram',
+    'LATENCY_BUCKETS',
+    'query_metrics',
+    'refresh_robot_registry',
     'get_all_robots',
     'insert_robot',
     'get_robot_instructions',
     'insert_instruction',
     'get_robot_telemetry',
     'insert_telemetry',
+    'insert_telemetry_batch',
+    'get_telemetry_rollups',
     'get_robot_summary',
     'insert_summary'
 ]
 
 # Initialize database handler
-db_handler = DatabaseHandler(DB_PATH)
+db_handler = DatabaseHandler(
+    DB_PATH,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    pragmas=get_pragmas(DB_PROFILE)
+)
 BaseModel.set_db_handler(db_handler)
 
-def get_all_robots() -> List[Dict[str, Any]]:
-    """Get all robots from database"""
+# Per-statement SQL profiling, off unless SQL_PROFILER is set
+query_profiler = QueryProfiler(slow_query_ms=float(os.getenv("SLOW_QUERY_MS", "100")))
+if os.getenv("SQL_PROFILER", "0") not in ("", "0"):
+    query_profiler.enable()
+
+def refresh_robot_registry() -> int:
+    """Reload the robot registry from the database and return its version"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, created_at FROM robots")
-        rows = cursor.fetchall()
-        conn.close()
-        return [{"id": r[0], "name": r[1], "created_at": r[2]} for r in rows]
+        version = robot_registry.version
+        with db_handler.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, name, created_at, slot FROM robots ORDER BY rowid")
+            rows = cursor.fetchall()
+        robot_registry.replace(
+            [{"id": r[0], "name": r[1], "created_at": r[2]} for r in rows], version,
+            slots={r[3]: r[0] for r in rows if r[3] is not None}
+        )
+        return robot_registry.version
     except Exception as e:
-        logger.error(f"Error getting robots: {e}")
+        logger.error(f"Error loading robots: {e}")
         raise
 
+def get_all_robots() -> List[Dict[str, Any]]:
+    """Get all robots, from the registry unless it is stale"""
+    if robot_registry.is_stale():
+        refresh_robot_registry()
+    return robot_registry.all()
+
 def insert_robot(robot_id: str, name: str) -> None:
     """Insert a new robot"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO robots (id, name) VALUES (?, ?)",
-            (robot_id, name)
-        )
-        conn.commit()
-        conn.close()
+        created_at = datetime.now().isoformat()
+        slot = db_handler.write(lambda conn: Robot.store(conn, robot_id, name, created_at))
+        robot_registry.add(robot_id, name, created_at, slot)
     except Exception as e:
         logger.error(f"Error inserting robot: {e}")
         raise
@@ -60,19 +106,20 @@ def insert_robot(robot_id: str, name: str) -> None:
 def get_robot_instructions(robot_id: str) -> Optional[List[int]]:
     """Get current instructions for a robot"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT blocks FROM instructions 
-            WHERE robot_id = ? AND is_completed = FALSE 
-            ORDER BY id DESC LIMIT 1
-        """, (robot_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row and row[0]:
-            return [int(x) for x in row[0].split(',')]
-        return None
+        with db_handler.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT block_id FROM instruction_blocks
+                WHERE instruction_id = (
+                    SELECT id FROM instructions
+                    WHERE robot_id = ? AND is_completed = FALSE
+                    ORDER BY id DESC LIMIT 1
+                )
+                ORDER BY seq
+            """, (robot_id,))
+            rows = cursor.fetchall()
+
+        return [row[0] for row in rows] or None
     except Exception as e:
         logger.error(f"Error getting instructions: {e}")
         raise
@@ -80,14 +127,7 @@ def get_robot_instructions(robot_id: str) -> Optional[List[int]]:
 def insert_instruction(robot_id: str, blocks: List[int]) -> None:
     """Insert new instructions for a robot"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO instructions (robot_id, blocks)
-            VALUES (?, ?)
-        """, (robot_id, ','.join(map(str, blocks))))
-        conn.commit()
-        conn.close()
+        db_handler.write(lambda conn: Instruction.store(conn, robot_id, blocks))
     except Exception as e:
         logger.error(f"Error inserting instruction: {e}")
         raise
@@ -95,15 +135,14 @@ def insert_instruction(robot_id: str, blocks: List[int]) -> None:
 def get_robot_telemetry(robot_id: str) -> Optional[Dict[str, Any]]:
     """Get latest telemetry for a robot"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT speed, ultrasonic_distance, current_line, gripper_state, timestamp
-            FROM telemetry WHERE robot_id = ?
-            ORDER BY id DESC LIMIT 1
-        """, (robot_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_handler.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT speed, ultrasonic_distance, current_line, gripper_state, time_stamp
+                FROM telemetry WHERE robot_id = ?
+                ORDER BY id DESC LIMIT 1
+            """, (robot_id,))
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -122,31 +161,58 @@ def insert_telemetry(robot_id: str, speed: float, distance: float,
                     line: int, gripper: str) -> None:
     """Insert new telemetry data"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        db_handler.write(lambda conn: conn.execute("""
             INSERT INTO telemetry 
             (robot_id, speed, ultrasonic_distance, current_line, gripper_state)
             VALUES (?, ?, ?, ?, ?)
-        """, (robot_id, speed, distance, line, gripper))
-        conn.commit()
-        conn.close()
+        """, (robot_id, speed, distance, line, gripper)))
     except Exception as e:
         logger.error(f"Error inserting telemetry: {e}")
         raise
 
+def insert_telemetry_batch(rows: List[tuple]) -> int:
+    """Insert many telemetry rows in a single transaction.
+
+    Each row is (robot_id, speed, distance, displacement_status, line, gripper,
+    time_stamp); a time_stamp of None means the time of insertion.
+    """
+    try:
+        db_handler.write(lambda conn: conn.executemany("""
+            INSERT INTO telemetry
+            (robot_id, speed, ultrasonic_distance, displacement_status,
+             current_line, gripper_state, time_stamp)
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, rows))
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Error inserting telemetry batch: {e}")
+        raise
+
+def get_telemetry_rollups(robot_id: str, resolution: str = "minute",
+                          limit: int = 60) -> List[Dict[str, Any]]:
+    """Get the latest per-minute or per-hour telemetry aggregates for a robot"""
+    try:
+        table = ROLLUP_TABLES[resolution][0]
+        rows = db_handler.execute_query(f"""
+            SELECT * FROM {table} WHERE robot_id = ?
+            ORDER BY bucket DESC LIMIT ?
+        """, (robot_id, limit))
+        return [format_rollup(r) for r in rows]
+    except Exception as e:
+        logger.error(f"Error getting telemetry rollups: {e}")
+        raise
+
 def get_robot_summary(robot_id: str) -> Optional[Dict[str, Any]]:
     """Get latest summary for a robot"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT average_speed, timestamp
-            FROM summary WHERE robot_id = ?
-            ORDER BY id DESC LIMIT 1
-        """, (robot_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_handler.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT average_speed, timestamp
+                FROM summary WHERE robot_id = ?
+                ORDER BY id DESC LIMIT 1
+            """, (robot_id,))
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -161,14 +227,31 @@ def get_robot_summary(robot_id: str) -> Optional[Dict[str, Any]]:
 def insert_summary(robot_id: str, average_speed: float) -> None:
     """Insert new summary data"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        db_handler.write(lambda conn: conn.execute("""
             INSERT INTO summary (robot_id, average_speed)
             VALUES (?, ?)
-        """, (robot_id, average_speed))
-        conn.commit()
-        conn.close()
+        """, (robot_id, average_speed)))
     except Exception as e:
         logger.error(f"Error inserting summary: {e}")
-        raise
\ No newline at end of file
+        raise
+
+# Groups single telemetry POSTs into batched inserts
+telemetry_buffer = TelemetryBuffer(
+    insert_telemetry_batch,
+    max_size=int(os.getenv("TELEMETRY_BUFFER_SIZE", "10000")),
+    flush_size=int(os.getenv("TELEMETRY_FLUSH_SIZE", "500")),
+    flush_interval=float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "1.0"))
+)
+
+def _days(name: str, default: str) -> Optional[timedelta]:
+    value = os.getenv(name, default)
+    return timedelta(days=float(value)) if value else None
+
+# Rolls expired raw telemetry into minute/hour aggregates
+telemetry_retention = TelemetryRetention(
+    db_handler,
+    raw_retention=_days("TELEMETRY_RAW_RETENTION_DAYS", "7"),
+    minute_retention=_days("TELEMETRY_MINUTE_RETENTION_DAYS", "90"),
+    hour_retention=_days("TELEMETRY_HOUR_RETENTION_DAYS", ""),
+    interval=float(os.getenv("TELEMETRY_RETENTION_INTERVAL", "300"))
+)
@@ -0,0 +1,395 @@
+"""Async versions of the module-level database helpers, for use from async routes"""
+from .async_db_handler import AsyncDatabaseHandler
+from .base_model import AsyncBaseModel
+from .models import Instruction, Robot
+from .db_init import DB_PATH, DB_PROFILE
+from .db_writer import get_pragmas
+from .retention import ROLLUP_TABLES, format_rollup
+from .robot_registry import robot_registry
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Initialize async database handler
+db_handler = AsyncDatabaseHandler(
+    DB_PATH,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    pragmas=get_pragmas(DB_PROFILE)
+)
+AsyncBaseModel.set_db_handler(db_handler)
+
+async def refresh_robot_registry() -> int:
+    """Reload the robot registry from the database and return its version"""
+    try:
+        version = robot_registry.version
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("SELECT id, name, created_at, slot FROM robots ORDER BY rowid")
+        robot_registry.replace(
+            [{"id": r[0], "name": r[1], "created_at": r[2]} for r in rows], version,
+            slots={r[3]: r[0] for r in rows if r[3] is not None}
+        )
+        return robot_registry.version
+    except Exception as e:
+        logger.error(f"Error loading robots: {e}")
+        raise
+
+async def get_all_robots() -> List[Dict[str, Any]]:
+    """Get all robots, from the registry unless it is stale"""
+    if robot_registry.is_stale():
+        await refresh_robot_registry()
+    return robot_registry.all()
+
+def _group_by_robot(rows, make_entry) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Split robot-joined rows into (robots, {robot_id: [entries]}) in one pass.
+
+    Rows start with (id, name, created_at) and must be ordered by robot; the
+    remaining columns are NULL when the robot has no matching entry.
+    """
+    robots, entries = [], {}
+    for row in rows:
+        rid = row[0]
+        if rid not in entries:
+            robots.append({"id": rid, "name": row[1], "created_at": row[2]})
+            entries[rid] = []
+        if row[3] is not None:
+            entries[rid].append(make_entry(row[3:]))
+    return robots, entries
+
+async def get_robots_with_instructions() -> Tuple[List[Dict[str, Any]], Dict[str, List[int]]]:
+    """Get every robot with the blocks of its latest pending instruction"""
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT r.id, r.name, r.created_at, b.block_id
+                FROM robots r
+                LEFT JOIN instruction_blocks b ON b.instruction_id = (
+                    SELECT i.id FROM instructions i
+                    WHERE i.robot_id = r.id AND i.is_completed = FALSE
+                    ORDER BY i.id DESC LIMIT 1
+                )
+                ORDER BY r.rowid, b.seq
+            """)
+        robots, blocks = _group_by_robot(rows, lambda cols: cols[0])
+        return robots, {rid: b or None for rid, b in blocks.items()}
+    except Exception as e:
+        logger.error(f"Error getting robot instructions: {e}")
+        raise
+
+async def get_robots_with_telemetry(limit: int = 20) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Get every robot with its latest ``limit`` telemetry rows, newest first"""
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT r.id, r.name, r.created_at,
+                       t.id, t.speed, t.ultrasonic_distance, t.current_line, t.gripper_state, t.time_stamp
+                FROM robots r
+                LEFT JOIN telemetry t ON t.id IN (
+                    SELECT id FROM telemetry WHERE robot_id = r.id
+                    ORDER BY id DESC LIMIT ?
+                )
+                ORDER BY r.rowid, t.id DESC
+            """, (limit,))
+        return _group_by_robot(rows, lambda cols: {
+            "id": cols[0], "speed": cols[1], "ultrasonic_distance": cols[2],
+            "current_line": cols[3], "gripper_state": cols[4], "time_stamp": cols[5]
+        })
+    except Exception as e:
+        logger.error(f"Error getting robot telemetry: {e}")
+        raise
+
+async def get_robots_with_summary() -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Get every robot with the timestamp of its latest summary"""
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT r.id, r.name, r.created_at,
+                       (SELECT s.timestamp FROM summary s
+                        WHERE s.robot_id = r.id
+                        ORDER BY s.id DESC LIMIT 1)
+                FROM robots r
+                ORDER BY r.rowid
+            """)
+        return _group_by_robot(rows, lambda cols: {"time_stamp": cols[0]})
+    except Exception as e:
+        logger.error(f"Error getting robot summaries: {e}")
+        raise
+
+async def get_data_versions() -> Dict[str, Optional[int]]:
+    """Cheap fingerprint of each table's contents, for cache keys.
+
+    Returns the trigger-maintained counters from ``data_versions`` plus the
+    lowest and highest telemetry ids (both index lookups).
+    """
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT name, version FROM data_versions
+                UNION ALL SELECT 'telemetry_min', MIN(id) FROM telemetry
+                UNION ALL SELECT 'telemetry_max', MAX(id) FROM telemetry
+            """)
+        return dict(rows)
+    except Exception as e:
+        logger.error(f"Error getting data versions: {e}")
+        raise
+
+async def insert_robot(robot_id: str, name: str) -> None:
+    """Insert a new robot"""
+    try:
+        created_at = datetime.now().isoformat()
+        slot = await db_handler.write(lambda conn: Robot.store(conn, robot_id, name, created_at))
+        robot_registry.add(robot_id, name, created_at, slot)
+    except Exception as e:
+        logger.error(f"Error inserting robot: {e}")
+        raise
+
+async def get_robot_instructions(robot_id: str) -> Optional[List[int]]:
+    """Get current instructions for a robot"""
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT block_id FROM instruction_blocks
+                WHERE instruction_id = (
+                    SELECT id FROM instructions
+                    WHERE robot_id = ? AND is_completed = FALSE
+                    ORDER BY id DESC LIMIT 1
+                )
+                ORDER BY seq
+            """, (robot_id,))
+
+        return [row[0] for row in rows] or None
+    except Exception as e:
+        logger.error(f"Error getting instructions: {e}")
+        raise
+
+async def insert_instruction(robot_id: str, blocks: List[int]) -> None:
+    """Insert new instructions for a robot"""
+    try:
+        await db_handler.write(lambda conn: Instruction.store(conn, robot_id, blocks))
+    except Exception as e:
+        logger.error(f"Error inserting instruction: {e}")
+        raise
+
+async def get_robots_pending_block(block_id: int) -> List[str]:
+    """Ids of the robots with a pending instruction that includes ``block_id``"""
+    try:
+        async with db_handler.connection() as conn:
+            rows = await conn.execute_fetchall("""
+                SELECT DISTINCT i.robot_id
+                FROM instruction_blocks b
+                JOIN instructions i ON i.id = b.instruction_id
+                WHERE b.block_id = ? AND i.is_completed = FALSE
+                ORDER BY i.robot_id
+            """, (block_id,))
+        return [row[0] for row in rows]
+    except Exception as e:
+        logger.error(f"Error getting robots for block: {e}")
+        raise
+
+async def get_robot_telemetry(robot_id: str) -> Optional[Dict[str, Any]]:
+    """Get latest telemetry for a robot"""
+    try:
+        async with db_handler.connection() as conn:
+            async with conn.execute("""
+                SELECT speed, ultrasonic_distance, current_line, gripper_state, time_stamp
+                FROM telemetry WHERE robot_id = ?
+                ORDER BY id DESC LIMIT 1
+            """, (robot_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if row:
+            return {
+                "speed": row[0],
+                "ultrasonic_distance": row[1],
+                "current_line": row[2],
+                "gripper_state": row[3],
+                "timestamp": row[4]
+            }
+        return None
+    except Exception as e:
+        logger.error(f"Error getting telemetry: {e}")
+        raise
+
+def _keyset(column: str, after_id: Optional[int], before_id: Optional[int]) -> Tuple[List[str], tuple, str]:
+    """WHERE conditions, params and sort order for one page of an id-keyed listing.
+
+    Pages run newest first (``before_id``) unless ``after_id`` is given, in
+    which case they run oldest first so a client can follow new rows.
+    """
+    conditions, params = [], ()
+    if after_id is not None:
+        conditions.append(f"{column} > ?")
+        params += (after_id,)
+    if before_id is not None:
+        conditions.append(f"{column} < ?")
+        params += (before_id,)
+    return conditions, params, "ASC" if after_id is not None else "DESC"
+
+async def _iter_rows(query: str, params: tuple, chunk_size: int = 200) -> AsyncIterator[tuple]:
+    """Yield query rows in chunks without materializing the whole result"""
+    async with db_handler.connection() as conn:
+        async with conn.execute(query, params) as cursor:
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row
+
+async def iter_telemetry_page(robot_id: str, after_id: Optional[int] = None,
+                              before_id: Optional[int] = None, since: Optional[str] = None,
+                              until: Optional[str] = None, limit: int = 100) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one keyset page of a robot's telemetry, optionally bounded in time"""
+    conditions, params, order = _keyset("id", after_id, before_id)
+    conditions.insert(0, "robot_id = ?")
+    params = (robot_id,) + params
+    if since is not None:
+        conditions.append("datetime(time_stamp) >= datetime(?)")
+        params += (since,)
+    if until is not None:
+        conditions.append("datetime(time_stamp) < datetime(?)")
+        params += (until,)
+    try:
+        async for row in _iter_rows(f"""
+            SELECT id, speed, ultrasonic_distance, displacement_status, current_line,
+                   gripper_state, time_stamp
+            FROM telemetry
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id {order} LIMIT ?
+        """, params + (limit,)):
+            yield {
+                "id": row[0],
+                "speed": row[1],
+                "ultrasonic_distance": row[2],
+                "displacement_status": row[3],
+                "current_line": row[4],
+                "gripper_state": row[5],
+                "time_stamp": row[6]
+            }
+    except Exception as e:
+        logger.error(f"Error paging telemetry: {e}")
+        raise
+
+async def iter_instruction_history(robot_id: Optional[str] = None, after_id: Optional[int] = None,
+                                   before_id: Optional[int] = None, completed: Optional[bool] = None,
+                                   limit: int = 50) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one keyset page of instructions, optionally for a single robot"""
+    conditions, params, order = _keyset("i.id", after_id, before_id)
+    if robot_id is not None:
+        conditions.append("i.robot_id = ?")
+        params += (robot_id,)
+    if completed is not None:
+        conditions.append("i.is_completed = ?")
+        params += (completed,)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    try:
+        # One row per block; rows of an instruction are consecutive
+        entry = None
+        async for row in _iter_rows(f"""
+            SELECT h.id, h.robot_id, h.name, h.is_completed, b.block_id
+            FROM (
+                SELECT i.id, i.robot_id, r.name, i.is_completed
+                FROM instructions i
+                JOIN robots r ON i.robot_id = r.id
+                {where}
+                ORDER BY i.id {order} LIMIT ?
+            ) h
+            LEFT JOIN instruction_blocks b ON b.instruction_id = h.id
+            ORDER BY h.id {order}, b.seq
+        """, params + (limit,)):
+            if entry is None or entry["id"] != row[0]:
+                if entry is not None:
+                    yield entry
+                entry = {
+                    "id": row[0],
+                    "robot_id": row[1],
+                    "robot_name": row[2],
+                    "blocks": [],
+                    "is_completed": bool(row[3])
+                }
+            if row[4] is not None:
+                entry["blocks"].append(row[4])
+        if entry is not None:
+            yield entry
+    except Exception as e:
+        logger.error(f"Error paging instruction history: {e}")
+        raise
+
+async def insert_telemetry(robot_id: str, speed: float, distance: float,
+                           line: int, gripper: str) -> None:
+    """Insert new telemetry data"""
+    try:
+        await db_handler.write(lambda conn: conn.execute("""
+            INSERT INTO telemetry
+            (robot_id, speed, ultrasonic_distance, current_line, gripper_state)
+            VALUES (?, ?, ?, ?, ?)
+        """, (robot_id, speed, distance, line, gripper)))
+    except Exception as e:
+        logger.error(f"Error inserting telemetry: {e}")
+        raise
+
+async def insert_telemetry_batch(rows: List[tuple]) -> int:
+    """Insert many telemetry rows in a single transaction.
+
+    Each row is (robot_id, speed, distance, displacement_status, line, gripper,
+    time_stamp); a time_stamp of None means the time of insertion.
+    """
+    try:
+        await db_handler.write(lambda conn: conn.executemany("""
+            INSERT INTO telemetry
+            (robot_id, speed, ultrasonic_distance, displacement_status,
+             current_line, gripper_state, time_stamp)
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, rows))
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Error inserting telemetry batch: {e}")
+        raise
+
+async def get_telemetry_rollups(robot_id: str, resolution: str = "minute",
+                                limit: int = 60) -> List[Dict[str, Any]]:
+    """Get the latest per-minute or per-hour telemetry aggregates for a robot"""
+    try:
+        table = ROLLUP_TABLES[resolution][0]
+        rows = await db_handler.execute_query(f"""
+            SELECT * FROM {table} WHERE robot_id = ?
+            ORDER BY bucket DESC LIMIT ?
+        """, (robot_id, limit))
+        return [format_rollup(r) for r in rows]
+    except Exception as e:
+        logger.error(f"Error getting telemetry rollups: {e}")
+        raise
+
+async def get_robot_summary(robot_id: str) -> Optional[Dict[str, Any]]:
+    """Get latest summary for a robot"""
+    try:
+        async with db_handler.connection() as conn:
+            async with conn.execute("""
+                SELECT average_speed, timestamp
+                FROM summary WHERE robot_id = ?
+                ORDER BY id DESC LIMIT 1
+            """, (robot_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if row:
+            return {
+                "average_speed": row[0],
+                "timestamp": row[1]
+            }
+        return None
+    except Exception as e:
+        logger.error(f"Error getting summary: {e}")
+        raise
+
+async def insert_summary(robot_id: str, average_speed: float) -> None:
+    """Insert new summary data"""
+    try:
+        await db_handler.write(lambda conn: conn.execute("""
+            INSERT INTO summary (robot_id, average_speed)
+            VALUES (?, ?)
+        """, (robot_id, average_speed)))
+    except Exception as e:
+        logger.error(f"Error inserting summary: {e}")
+        raise
@@ -0,0 +1,138 @@
+import asyncio
+import queue
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Callable, Optional
+import logging
+
+import aiosqlite
+
+from .db_writer import connection_pragma_statements, get_writer
+from .query_metrics import TimedConnection, query_metrics
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseHandler:
+    """Asyncio counterpart of DatabaseHandler built on aiosqlite.
+
+    Each pooled aiosqlite connection runs its SQLite calls on its own worker
+    thread, so awaiting a query never blocks the event loop. The pool is
+    bounded by ``pool_size`` and filled lazily on first use. Writes are
+    awaited on the same single DatabaseWriter thread the sync handler uses.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 5, timeout: float = 30.0,
+                 cached_statements: int = 128, health_check_interval: float = 30.0,
+                 pragmas: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.writer = get_writer(db_path, self.pragmas)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self._pool = asyncio.LifoQueue(maxsize=pool_size)
+        self._created = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.db_path,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection
+        )
+        for statement in connection_pragma_statements(self.pragmas):
+            await conn.execute(statement)
+        return conn
+
+    async def _is_healthy(self, conn: aiosqlite.Connection) -> bool:
+        try:
+            async with conn.execute("SELECT 1") as cursor:
+                await cursor.fetchone()
+            return True
+        except (sqlite3.Error, ValueError):
+            return False
+
+    async def _discard(self, conn: aiosqlite.Connection) -> None:
+        self._created -= 1
+        try:
+            await conn.close()
+        except (sqlite3.Error, ValueError):
+            pass
+
+    async def _acquire(self) -> aiosqlite.Connection:
+        try:
+            conn, last_used = self._pool.get_nowait()
+        except asyncio.QueueEmpty:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return await self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+            try:
+                conn, last_used = await asyncio.wait_for(self._pool.get(), self.timeout)
+            except asyncio.TimeoutError:
+                raise sqlite3.OperationalError(
+                    f"Timed out waiting for a connection to {self.db_path}"
+                )
+
+        # Only ping connections that have been idle for a while
+        if time.monotonic() - last_used >= self.health_check_interval and not await self._is_healthy(conn):
+            logger.warning("Discarding unhealthy pooled connection")
+            await self._discard(conn)
+            return await self._acquire()
+        return conn
+
+    async def _release(self, conn: aiosqlite.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+        except (sqlite3.Error, ValueError):
+            await self._discard(conn)
+            return
+        self._pool.put_nowait((conn, time.monotonic()))
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self._acquire()
+        try:
+            yield conn
+        finally:
+            await self._release(conn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn(conn)`` in a transaction on the writer thread without blocking the loop"""
+        try:
+            future = self.writer.submit(fn, block=False)
+        except queue.Full:
+            # Wait for room in the writer queue on a worker thread, not on the loop
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(None, self.writer.submit, fn)
+        return await asyncio.wrap_future(future)
+
+    async def close_all(self) -> None:
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            await self._discard(conn)
+
+    async def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        try:
+            if query_metrics.statement_type(query) != "SELECT":
+                await self.write(lambda conn: conn.execute(query, params or ()))
+                return []
+
+            async with self.connection() as conn:
+                async with conn.execute(query, params or ()) as cursor:
+                    columns = [description[0] for description in cursor.description]
+                    results = await cursor.fetchall()
+                    return [dict(zip(columns, row)) for row in results]
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            raise
@@ -1,25 +1,98 @@
-from typing import Dict, Any, List
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Any, Callable, Iterable, List, Sequence, Tuple, Union
 from .db_handler import DatabaseHandler
+from .async_db_handler import AsyncDatabaseHandler
+
+# Generated SQL is cached per table and column set, so repeated calls reuse
+# the same string and hit sqlite3's per-connection prepared statement cache
+@lru_cache(maxsize=256)
+def insert_sql(table: str, columns: Tuple[str, ...], returning: str = "") -> str:
+    placeholders = ', '.join('?' * len(columns))
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    return f"{query} RETURNING {returning}" if returning else query
+
+@lru_cache(maxsize=256)
+def update_sql(table: str, columns: Tuple[str, ...], key: str = "id") -> str:
+    set_clause = ', '.join(f"{column} = ?" for column in columns)
+    return f"UPDATE {table} SET {set_clause} WHERE {key} = ?"
+
+@lru_cache(maxsize=64)
+def delete_sql(table: str, key: str = "id") -> str:
+    return f"DELETE FROM {table} WHERE {key} = ?"
+
+def _insert_one(table: str, data: Dict[str, Any]) -> Callable[[sqlite3.Connection], Dict[str, Any]]:
+    """Writer job inserting ``data`` and returning the stored row"""
+    query = insert_sql(table, tuple(data), "*")
+    values = tuple(data.values())
+
+    def insert(conn: sqlite3.Connection) -> Dict[str, Any]:
+        cursor = conn.execute(query, values)
+        columns = [description[0] for description in cursor.description]
+        return dict(zip(columns, cursor.fetchall()[0]))
+    return insert
+
+def _insert_many(table: str, key: str, rows: Sequence[Dict[str, Any]],
+                 returning: bool) -> Callable[[sqlite3.Connection], Union[int, List[Any]]]:
+    """Writer job inserting ``rows`` (dicts sharing the keys of the first one)"""
+    columns = tuple(rows[0])
+    params = [tuple(row[column] for column in columns) for row in rows]
+    if not returning:
+        query = insert_sql(table, columns)
+        return lambda conn: conn.executemany(query, params)
+
+    # executemany cannot return rows, so run the prepared RETURNING statement
+    # once per row; it is still a single transaction on the writer thread
+    query = insert_sql(table, columns, key)
+    return lambda conn: [conn.execute(query, values).fetchall()[0][0] for values in params]
+
+def _update_many(table: str, key: str, rows: Sequence[Dict[str, Any]]) -> Callable[[sqlite3.Connection], Any]:
+    """Writer job applying ``rows``; each holds ``key`` plus the columns to set"""
+    columns = tuple(column for column in rows[0] if column != key)
+    query = update_sql(table, columns, key)
+    params = [tuple(row[column] for column in columns) + (row[key],) for row in rows]
+    return lambda conn: conn.executemany(query, params)
+
+def _delete_many(table: str, key: str, ids: Iterable[Any]) -> Callable[[sqlite3.Connection], Any]:
+    query = delete_sql(table, key)
+    params = [(id_value,) for id_value in ids]
+    return lambda conn: conn.executemany(query, params)
 
 class BaseModel:
     table_name: str = ""
+    primary_key: str = "id"
     db_handler: DatabaseHandler = None
 
     @classmethod
     def set_db_handler(cls, handler: DatabaseHandler):
         cls.db_handler = handler
 
+    @classmethod
+    def _bulk_written(cls) -> None:
+        """Called after every bulk write; models that cache rows override it"""
+
     @classmethod
     def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?' for _ in data])
-        query = f"INSERT INTO {cls.table_name} ({columns}) VALUES ({placeholders})"
-        
-        return cls.db_handler.execute_query(query, tuple(data.values()))
+        return cls.db_handler.write(_insert_one(cls.table_name, data))
+
+    @classmethod
+    def bulk_create(cls, rows: Sequence[Dict[str, Any]],
+                    returning: bool = False) -> Union[int, List[Any]]:
+        """Insert ``rows`` in one transaction.
+
+        Every row must have the keys of the first one. Returns the number of
+        rows inserted, or their primary keys in order when ``returning``.
+        """
+        if not rows:
+            return [] if returning else 0
+        try:
+            return cls.db_handler.write(_insert_many(cls.table_name, cls.primary_key, rows, returning))
+        finally:
+            cls._bulk_written()
 
     @classmethod
     def get_by_id(cls, id_value: Any) -> Dict[str, Any]:
-        query = f"SELECT * FROM {cls.table_name} WHERE id = ?"
+        query = f"SELECT * FROM {cls.table_name} WHERE {cls.primary_key} = ?"
         results = cls.db_handler.execute_query(query, (id_value,))
         return results[0] if results else None
 
@@ -30,12 +103,99 @@ class BaseModel:
 
     @classmethod
     def update(cls, id_value: Any, data: Dict[str, Any]) -> None:
-        set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
-        query = f"UPDATE {cls.table_name} SET {set_clause} WHERE id = ?"
+        query = update_sql(cls.table_name, tuple(data), cls.primary_key)
         values = tuple(data.values()) + (id_value,)
         cls.db_handler.execute_query(query, values)
 
+    @classmethod
+    def bulk_update(cls, rows: Sequence[Dict[str, Any]]) -> int:
+        """Update many rows in one transaction and return how many changed.
+
+        Each row holds the primary key plus the columns to set, the same
+        columns for every row.
+        """
+        if not rows:
+            return 0
+        try:
+            return cls.db_handler.write(_update_many(cls.table_name, cls.primary_key, rows))
+        finally:
+            cls._bulk_written()
+
     @classmethod
     def delete(cls, id_value: Any) -> None:
-        query = f"DELETE FROM {cls.table_name} WHERE id = ?"
-        cls.db_handler.execute_query(query, (id_value,))
\ No newline at end of file
+        cls.db_handler.execute_query(delete_sql(cls.table_name, cls.primary_key), (id_value,))
+
+    @classmethod
+    def bulk_delete(cls, ids: Iterable[Any]) -> int:
+        """Delete rows by primary key in one transaction and return how many went"""
+        try:
+            return cls.db_handler.write(_delete_many(cls.table_name, cls.primary_key, ids))
+        finally:
+            cls._bulk_written()
+
+class AsyncBaseModel:
+    table_name: str = ""
+    primary_key: str = "id"
+    db_handler: AsyncDatabaseHandler = None
+
+    @classmethod
+    def set_db_handler(cls, handler: AsyncDatabaseHandler):
+        cls.db_handler = handler
+
+    @classmethod
+    def _bulk_written(cls) -> None:
+        """Called after every bulk write; models that cache rows override it"""
+
+    @classmethod
+    async def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await cls.db_handler.write(_insert_one(cls.table_name, data))
+
+    @classmethod
+    async def bulk_create(cls, rows: Sequence[Dict[str, Any]],
+                          returning: bool = False) -> Union[int, List[Any]]:
+        """Insert ``rows`` in one transaction (see BaseModel.bulk_create)"""
+        if not rows:
+            return [] if returning else 0
+        try:
+            return await cls.db_handler.write(_insert_many(cls.table_name, cls.primary_key, rows, returning))
+        finally:
+            cls._bulk_written()
+
+    @classmethod
+    async def get_by_id(cls, id_value: Any) -> Dict[str, Any]:
+        query = f"SELECT * FROM {cls.table_name} WHERE {cls.primary_key} = ?"
+        results = await cls.db_handler.execute_query(query, (id_value,))
+        return results[0] if results else None
+
+    @classmethod
+    async def get_all(cls) -> List[Dict[str, Any]]:
+        query = f"SELECT * FROM {cls.table_name}"
+        return await cls.db_handler.execute_query(query)
+
+    @classmethod
+    async def update(cls, id_value: Any, data: Dict[str, Any]) -> None:
+        query = update_sql(cls.table_name, tuple(data), cls.primary_key)
+        values = tuple(data.values()) + (id_value,)
+        await cls.db_handler.execute_query(query, values)
+
+    @classmethod
+    async def bulk_update(cls, rows: Sequence[Dict[str, Any]]) -> int:
+        """Update many rows in one transaction (see BaseModel.bulk_update)"""
+        if not rows:
+            return 0
+        try:
+            return await cls.db_handler.write(_update_many(cls.table_name, cls.primary_key, rows))
+        finally:
+            cls._bulk_written()
+
+    @classmethod
+    async def delete(cls, id_value: Any) -> None:
+        await cls.db_handler.execute_query(delete_sql(cls.table_name, cls.primary_key), (id_value,))
+
+    @classmethod
+    async def bulk_delete(cls, ids: Iterable[Any]) -> int:
+        """Delete rows by primary key in one transaction"""
+        try:
+            return await cls.db_handler.write(_delete_many(cls.table_name, cls.primary_key, ids))
+        finally:
+            cls._bulk_written()
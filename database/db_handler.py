@@ -1,38 +1,325 @@
+import re
 import sqlite3
+import queue
+import threading
+import time
 from contextlib import contextmanager
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Optional
 import logging
+from .db_writer import apply_pragmas, get_writer
+from .query_metrics import TimedConnection, TimedCursor, query_metrics
 
 logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger(__name__ + ".slow")
+
+# Statement types whose plan is worth recording
+EXPLAINED_TYPES = frozenset(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryStats:
+    """Accumulated cost of one normalized statement"""
+
+    __slots__ = ("statement", "calls", "total", "max", "rows", "plan", "full_scans")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.total = 0.0     # seconds spent in execute and fetches
+        self.max = 0.0       # slowest single execute
+        self.rows = 0        # rows fetched, or changed for writes
+        self.plan: List[str] = []
+        self.full_scans: List[str] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "full_scan": bool(self.full_scans),
+            "full_scans": self.full_scans,
+            "plan": self.plan,
+        }
+
+class ProfiledCursor(TimedCursor):
+    """Cursor handed out while profiling; charges fetched rows and fetch time to its statement"""
+
+    stats: Optional[QueryStats] = None
+    profiler: Optional["QueryProfiler"] = None
+
+    def _charge(self, rows: int, seconds: float) -> None:
+        if self.stats is not None:
+            self.profiler.charge(self.stats, rows, seconds)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._charge(row is not None, time.perf_counter() - start)
+        return row
+
+    def fetchmany(self, size: int = -1):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size < 0 else size)
+        self._charge(len(rows), time.perf_counter() - start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._charge(len(rows), time.perf_counter() - start)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._charge(1, time.perf_counter() - start)
+        return row
+
+class QueryProfiler:
+    """Opt-in per-statement SQL profiler.
+
+    Once enabled, every statement run on a TimedConnection is grouped by its
+    normalized text (literals replaced by ``?``, whitespace collapsed) and
+    the group records calls, time, rows and the ``EXPLAIN QUERY PLAN`` taken
+    the first time it is seen; plans containing a full table scan are
+    flagged. Executes slower than ``slow_query_ms`` are logged to the
+    ``database.db_handler.slow`` logger.
+    """
+
+    cursor_class = ProfiledCursor
+
+    def __init__(self, slow_query_ms: float = 100.0, max_statements: int = 500):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.max_statements = max_statements
+        self._stats: Dict[str, QueryStats] = {}
+        self._normalized: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return query_metrics.profiler is self
+
+    def enable(self) -> None:
+        query_metrics.profiler = self
+
+    def disable(self) -> None:
+        if query_metrics.profiler is self:
+            query_metrics.profiler = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def normalize(self, sql: str) -> str:
+        normalized = self._normalized.get(sql)
+        if normalized is None:
+            normalized = _LITERALS.sub("?", sql)
+            normalized = _VALUE_LISTS.sub("(?, ...)", normalized)
+            normalized = _WHITESPACE.sub(" ", normalized).strip()
+            if len(self._normalized) < self.max_statements * 4:
+                self._normalized[sql] = normalized
+        return normalized
+
+    def _stats_for(self, conn: sqlite3.Connection, sql: str, parameters) -> Optional[QueryStats]:
+        statement = self.normalize(sql)
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is not None or len(self._stats) >= self.max_statements:
+                return stats
+            stats = self._stats[statement] = QueryStats(statement)
+        if parameters is not None and query_metrics.statement_type(sql) in EXPLAINED_TYPES:
+            self._explain(conn, sql, parameters, stats)
+        return stats
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, parameters, stats: QueryStats) -> None:
+        try:
+            rows = conn.cursor(sqlite3.Cursor).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            stats.plan = [f"EXPLAIN failed: {e}"]
+            return
+        stats.plan = [row[3] for row in rows]
+        # "SCAN t" without an index reads the whole table; CTEs and
+        # subqueries also show up as SCAN but name no table
+        stats.full_scans = [detail for detail in stats.plan
+                            if detail.startswith("SCAN ") and " USING " not in detail
+                            and not detail.startswith(("SCAN (", "SCAN CONSTANT ROW"))]
+
+    def charge(self, stats: QueryStats, rows: int, seconds: float) -> None:
+        with self._lock:
+            stats.rows += rows
+            stats.total += seconds
+
+    def _record(self, stats: Optional[QueryStats], sql: str, seconds: float, rows: int) -> None:
+        query_metrics.observe(sql, seconds)
+        if stats is not None:
+            with self._lock:
+                stats.calls += 1
+                stats.total += seconds
+                stats.rows += rows
+                if seconds > stats.max:
+                    stats.max = seconds
+        if seconds >= self.slow_query_seconds:
+            slow_query_logger.warning(f"Slow query ({seconds * 1000:.1f} ms): {self.normalize(sql)}")
+
+    def execute(self, cursor: sqlite3.Cursor, sql: str, parameters=()) -> sqlite3.Cursor:
+        stats = self._stats_for(cursor.connection, sql, parameters)
+        start = time.perf_counter()
+        try:
+            sqlite3.Cursor.execute(cursor, sql, parameters)
+        finally:
+            self._record(stats, sql, time.perf_counter() - start, max(cursor.rowcount, 0))
+        if isinstance(cursor, ProfiledCursor):
+            cursor.stats, cursor.profiler = stats, self
+        return cursor
+
+    def executemany(self, cursor: sqlite3.Cursor, sql: str, seq_of_parameters: Iterable) -> sqlite3.Cursor:
+        stats = self._stats_for(cursor.connection, sql, None)
+        start = time.perf_counter()
+        try:
+            sqlite3.Cursor.executemany(cursor, sql, seq_of_parameters)
+        finally:
+            self._record(stats, sql, time.perf_counter() - start, max(cursor.rowcount, 0))
+        return cursor
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Profiled statements, most expensive first"""
+        with self._lock:
+            stats = [s.as_dict() for s in self._stats.values()]
+        return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
 
 class DatabaseHandler:
-    def __init__(self, db_path: str):
+    """Owns a bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to ``pool_size`` and handed out to one
+    thread at a time, so they are created with ``check_same_thread=False``.
+    Because connections outlive a single call, sqlite3's per-connection
+    statement cache (``cached_statements``) lets repeated queries reuse their
+    prepared statements instead of being re-parsed on every request.
+
+    Pooled connections are meant for reads. Writes go through ``write``, which
+    hands them to the single DatabaseWriter thread for this database file.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 5, timeout: float = 30.0,
+                 cached_statements: int = 128, health_check_interval: float = 30.0,
+                 pragmas: Optional[Dict[str, Any]] = None):
         self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.writer = get_writer(db_path, self.pragmas)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection
+        )
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn, last_used = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                conn, last_used = self._pool.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError(
+                    f"Timed out waiting for a connection to {self.db_path}"
+                )
+
+        # Only ping connections that have been idle for a while
+        if time.monotonic() - last_used >= self.health_check_interval and not self._is_healthy(conn):
+            logger.warning("Discarding unhealthy pooled connection")
+            self._discard(conn)
+            return self._acquire()
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._pool.put_nowait((conn, time.monotonic()))
 
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._acquire()
         try:
             yield conn
         finally:
-            conn.close()
+            self._release(conn)
+
+    def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn(conn)`` in a transaction on the writer thread"""
+        return self.writer.write(fn)
+
+    def close_all(self) -> None:
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
 
     def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         try:
+            if query_metrics.statement_type(query) != "SELECT":
+                self.write(lambda conn: conn.execute(query, params or ()))
+                return []
+
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 if params:
                     cursor.execute(query, params)
                 else:
                     cursor.execute(query)
-                
-                if query.strip().upper().startswith('SELECT'):
-                    columns = [description[0] for description in cursor.description]
-                    results = cursor.fetchall()
-                    return [dict(zip(columns, row)) for row in results]
-                else:
-                    conn.commit()
-                    return []
+
+                columns = [description[0] for description in cursor.description]
+                results = cursor.fetchall()
+                return [dict(zip(columns, row)) for row in results]
         except Exception as e:
             logger.error(f"Database error: {e}")
-            raise
\ No newline at end of file
+            raise
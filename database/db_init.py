@@ -1,10 +1,14 @@
 import os
 import sqlite3
 import logging
+from .migrations import migrate
+from .db_writer import get_pragmas
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join("data", "robots.db")
+# Pragma profile from db_writer.PRAGMA_PROFILES ("performance" enables WAL)
+DB_PROFILE = os.getenv("DB_PROFILE", "performance")
 
 def init_db():
     """Initialize database with all required tables"""
@@ -14,6 +18,11 @@ def init_db():
     cursor = conn.cursor()
     
     try:
+        # journal_mode is persistent, so set it once for the whole file
+        journal_mode = get_pragmas(DB_PROFILE).get("journal_mode")
+        if journal_mode:
+            cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+
         # Create robots table
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS robots (
@@ -42,9 +51,10 @@ def init_db():
             robot_id TEXT NOT NULL,
             speed REAL NOT NULL,
             ultrasonic_distance REAL NOT NULL,
+            displacement_status TEXT NULL,
             current_line INTEGER NOT NULL,
             gripper_state TEXT NOT NULL,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+            time_stamp TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(robot_id) REFERENCES robots(id)
         )
         """)
@@ -61,7 +71,10 @@ def init_db():
         """)
 
         conn.commit()
-        logger.info("Database initialized successfully")
+
+        # Upgrade existing databases in place and add indexes
+        version = migrate(conn)
+        logger.info(f"Database initialized successfully (schema v{version})")
         
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
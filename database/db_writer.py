@@ -0,0 +1,131 @@
+import sqlite3
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+import logging
+from .query_metrics import TimedConnection
+
+logger = logging.getLogger(__name__)
+
+# Named pragma sets; journal_mode is database-wide and applied by init_db,
+# the rest are per-connection and applied whenever a connection is opened
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,       # negative = KiB, so ~16 MB
+        "mmap_size": 268435456,     # 256 MB
+        "temp_store": "MEMORY",
+    },
+}
+
+def get_pragmas(profile: str) -> Dict[str, Any]:
+    try:
+        return PRAGMA_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown database profile: {profile}")
+
+def connection_pragma_statements(pragmas: Dict[str, Any]):
+    """PRAGMA statements to run on every new connection"""
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()
+            if name != "journal_mode"]
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]) -> None:
+    for statement in connection_pragma_statements(pragmas):
+        conn.execute(statement)
+
+class DatabaseWriter:
+    """Serializes every write to one database file through a dedicated thread.
+
+    Callers submit a function taking a ``sqlite3.Connection``; it runs in its
+    own transaction on the writer thread, which commits on success and rolls
+    back on error. Readers keep using their own pooled connections, so with
+    WAL enabled they never wait behind a writer. Submitted functions must not
+    themselves wait on the writer, or they will deadlock.
+
+    A function that returns a cursor resolves to its ``rowcount`` instead, so
+    cursors never leave the writer thread.
+    """
+
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None,
+                 max_queue: int = 10000, timeout: float = 30.0):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.timeout = timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="sqlite-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Finish queued writes, then stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any], block: bool = True) -> Future:
+        """Queue ``fn`` for the writer thread.
+
+        When the queue is full this waits up to ``timeout`` seconds for room,
+        or raises ``queue.Full`` straight away if ``block`` is false.
+        """
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put((fn, future), block=block, timeout=self.timeout)
+        except queue.Full:
+            raise queue.Full(f"Writer queue full ({self._queue.maxsize} pending writes)")
+        return future
+
+    def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn`` on the writer thread and wait for its result"""
+        return self.submit(fn).result()
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, factory=TimedConnection)
+        apply_pragmas(conn, self.pragmas)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                fn, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(conn)
+                    if isinstance(result, sqlite3.Cursor):
+                        result = result.rowcount
+                    conn.commit()
+                except BaseException as e:
+                    conn.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            conn.close()
+
+_writers: Dict[str, DatabaseWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_writer(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> DatabaseWriter:
+    """Return the single writer for ``db_path``, creating it on first use"""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = _writers[db_path] = DatabaseWriter(db_path, pragmas)
+        return writer
@@ -0,0 +1,189 @@
+import sqlite3
+from typing import Callable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _align_legacy_columns(conn: sqlite3.Connection) -> None:
+    """Bring databases created by older init scripts onto the current columns"""
+    telemetry = _columns(conn, "telemetry")
+    if "time_stamp" not in telemetry and "timestamp" in telemetry:
+        conn.execute("ALTER TABLE telemetry RENAME COLUMN timestamp TO time_stamp")
+    if "displacement_status" not in telemetry:
+        conn.execute("ALTER TABLE telemetry ADD COLUMN displacement_status TEXT NULL")
+
+    if "average_speed" not in _columns(conn, "summary"):
+        conn.execute("ALTER TABLE summary ADD COLUMN average_speed REAL")
+
+def _add_robot_indexes(conn: sqlite3.Connection) -> None:
+    """Cover the per-robot 'latest rows first' lookups used by the API"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_telemetry_robot_id
+        ON telemetry (robot_id, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_instructions_robot_pending
+        ON instructions (robot_id, is_completed, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_summary_robot_id
+        ON summary (robot_id, id)
+    """)
+
+def _add_telemetry_rollups(conn: sqlite3.Connection) -> None:
+    """Per-minute and per-hour aggregates that outlive the raw telemetry rows"""
+    for table in ("telemetry_minute", "telemetry_hour"):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                robot_id TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                samples INTEGER NOT NULL,
+                sum_speed REAL NOT NULL,
+                min_speed REAL,
+                max_speed REAL,
+                min_distance REAL,
+                lines_mask INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (robot_id, bucket)
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket)")
+
+# Tables whose every change bumps a counter in data_versions
+VERSIONED_TABLES = ("robots", "instructions", "summary")
+
+def _add_data_versions(conn: sqlite3.Connection) -> None:
+    """Change counters for the low-volume tables, maintained by triggers.
+
+    Telemetry is left out: it is append-only apart from retention, so its
+    MIN/MAX id already identify its contents without slowing down ingest.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table in VERSIONED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO data_versions (name) VALUES (?)", (table,))
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{operation.lower()}_version
+                AFTER {operation} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+def _add_instruction_blocks(conn: sqlite3.Connection) -> None:
+    """One row per block of each instruction, in order, so blocks can be queried.
+
+    ``instructions.blocks`` keeps its comma-joined copy for older readers;
+    existing instructions are backfilled from it here.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS instruction_blocks (
+            instruction_id INTEGER NOT NULL REFERENCES instructions(id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            block_id INTEGER NOT NULL,
+            PRIMARY KEY (instruction_id, seq)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_instruction_blocks_block
+        ON instruction_blocks (block_id, instruction_id)
+    """)
+    # foreign_keys is off on our connections, so cascade with a trigger
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_instructions_delete_blocks
+        AFTER DELETE ON instructions
+        BEGIN
+            DELETE FROM instruction_blocks WHERE instruction_id = old.id;
+        END
+    """)
+
+    rows = []
+    for instruction_id, blocks in conn.execute("SELECT id, blocks FROM instructions"):
+        parts = [part.strip() for part in (blocks or "").split(",")]
+        rows += [(instruction_id, seq, int(part)) for seq, part in enumerate(parts)
+                 if part.lstrip("-").isdigit()]
+    conn.executemany(
+        "INSERT OR IGNORE INTO instruction_blocks (instruction_id, seq, block_id) VALUES (?, ?, ?)",
+        rows
+    )
+
+# Highest slot a binary telemetry record can carry (uint16, see api/telemetry_format.py)
+MAX_ROBOT_SLOT = 65535
+
+def _add_robot_slots(conn: sqlite3.Connection) -> None:
+    """Stable numeric slot per robot for binary telemetry.
+
+    The slot used to be the robot's rowid, which VACUUM may renumber and
+    which is reused after deleting the newest robot. Slots are now handed
+    out by a trigger from a counter that only goes up, so a slot never
+    moves and never goes to another robot. Existing robots keep their
+    rowid, the slot their firmware may already have fetched.
+    """
+    conn.execute(f"ALTER TABLE robots ADD COLUMN slot INTEGER CHECK (slot BETWEEN 1 AND {MAX_ROBOT_SLOT})")
+    conn.execute(f"UPDATE robots SET slot = rowid WHERE rowid <= {MAX_ROBOT_SLOT}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_robots_slot ON robots (slot)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS robot_slot_counter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_slot INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO robot_slot_counter (id, last_slot)
+        SELECT 1, COALESCE(MAX(slot), 0) FROM robots
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_robots_assign_slot
+        AFTER INSERT ON robots WHEN new.slot IS NULL
+        BEGIN
+            UPDATE robot_slot_counter SET last_slot = last_slot + 1;
+            SELECT RAISE(ABORT, 'No robot slot left (max {MAX_ROBOT_SLOT})')
+            WHERE (SELECT last_slot FROM robot_slot_counter) > {MAX_ROBOT_SLOT};
+            UPDATE robots SET slot = (SELECT last_slot FROM robot_slot_counter)
+            WHERE rowid = new.rowid;
+        END
+    """)
+
+# (version, description, migration); append new entries, never edit old ones
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "align legacy telemetry/summary columns", _align_legacy_columns),
+    (2, "add per-robot indexes", _add_robot_indexes),
+    (3, "add telemetry rollup tables", _add_telemetry_rollups),
+    (4, "add data version counters", _add_data_versions),
+    (5, "add normalized instruction blocks", _add_instruction_blocks),
+    (6, "add stable robot slots", _add_robot_slots),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order, each in its own transaction.
+
+    The schema version is stored in SQLite's ``user_version`` header field,
+    which is updated inside the same transaction as the migration itself.
+    """
+    version = get_schema_version(conn)
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"Migrating database to v{target}: {description}")
+        try:
+            conn.execute("BEGIN")
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    return version
@@ -1,28 +1,125 @@
-from typing import List, Optional
+import sqlite3
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from .base_model import BaseModel
+from .base_model import BaseModel, update_sql
+from .robot_registry import robot_registry
 
 class Robot(BaseModel):
     table_name = "robots"
 
+    @staticmethod
+    def store(conn: sqlite3.Connection, robot_id: str, name: str, created_at: str) -> int:
+        """Insert a robot and return the telemetry slot its insert trigger assigned"""
+        rowid = conn.execute(
+            "INSERT INTO robots (id, name, created_at) VALUES (?, ?, ?)",
+            (robot_id, name, created_at)
+        ).lastrowid
+        return conn.execute("SELECT slot FROM robots WHERE rowid = ?", (rowid,)).fetchone()[0]
+
     @classmethod
     def create_with_name(cls, robot_id: str, name: str) -> dict:
-        return cls.create({
-            "id": robot_id,
-            "name": name,
-            "created_at": datetime.now().isoformat()
-        })
+        created_at = datetime.now().isoformat()
+        slot = cls.db_handler.write(lambda conn: cls.store(conn, robot_id, name, created_at))
+        robot_registry.add(robot_id, name, created_at, slot)
+        return cls.get_by_id(robot_id)
+
+    @classmethod
+    def _bulk_written(cls) -> None:
+        robot_registry.invalidate()
+
+    @classmethod
+    def update(cls, id_value: Any, data: Dict[str, Any]) -> None:
+        try:
+            super().update(id_value, data)
+        finally:
+            robot_registry.invalidate()
+
+    @classmethod
+    def delete(cls, id_value: Any) -> None:
+        try:
+            super().delete(id_value)
+        finally:
+            robot_registry.invalidate()
+
+    @classmethod
+    def get_all(cls) -> List[dict]:
+        """Served from the robot registry, reloaded from the table when stale"""
+        if robot_registry.is_stale():
+            version = robot_registry.version
+            robot_registry.replace(super().get_all(), version)
+        return robot_registry.all()
 
 class Instruction(BaseModel):
     table_name = "instructions"
 
+    @staticmethod
+    def store(conn: sqlite3.Connection, robot_id: str, blocks: List[int]) -> int:
+        """Insert an instruction and its instruction_blocks rows; runs on the writer thread"""
+        instruction_id = conn.execute("""
+            INSERT INTO instructions (robot_id, blocks, is_completed)
+            VALUES (?, ?, FALSE)
+        """, (robot_id, ",".join(map(str, blocks)))).lastrowid
+        Instruction._insert_blocks(conn, instruction_id, blocks)
+        return instruction_id
+
+    @staticmethod
+    def _insert_blocks(conn: sqlite3.Connection, instruction_id: int, blocks: List[int]) -> None:
+        conn.executemany(
+            "INSERT INTO instruction_blocks (instruction_id, seq, block_id) VALUES (?, ?, ?)",
+            [(instruction_id, seq, block) for seq, block in enumerate(blocks)]
+        )
+
+    @classmethod
+    def _update_rows(cls, conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> int:
+        """Apply updates that may set ``blocks``, keeping instruction_blocks in step.
+
+        ``blocks`` is a list of ids (the comma-joined text is accepted too);
+        the legacy column gets the joined text and the child rows are rewritten.
+        """
+        changed = 0
+        for row in rows:
+            data = dict(row)
+            id_value = data.pop(cls.primary_key)
+            blocks = data.get("blocks")
+            if blocks is not None:
+                if isinstance(blocks, str):
+                    blocks = [int(block) for block in blocks.split(",") if block]
+                data["blocks"] = ",".join(map(str, blocks))
+            changed += conn.execute(
+                update_sql(cls.table_name, tuple(data), cls.primary_key),
+                tuple(data.values()) + (id_value,)
+            ).rowcount
+            if blocks is not None:
+                conn.execute("DELETE FROM instruction_blocks WHERE instruction_id = ?", (id_value,))
+                cls._insert_blocks(conn, id_value, blocks)
+        return changed
+
+    @classmethod
+    def update(cls, id_value: Any, data: Dict[str, Any]) -> None:
+        if "blocks" not in data:
+            return super().update(id_value, data)
+        cls.db_handler.write(lambda conn: cls._update_rows(conn, [{**data, cls.primary_key: id_value}]))
+
+    @classmethod
+    def bulk_update(cls, rows: List[Dict[str, Any]]) -> int:
+        if not rows or "blocks" not in rows[0]:
+            return super().bulk_update(rows)
+        return cls.db_handler.write(lambda conn: cls._update_rows(conn, rows))
+
     @classmethod
     def create_for_robot(cls, robot_id: str, blocks: List[int]) -> dict:
-        return cls.create({
-            "robot_id": robot_id,
-            "blocks": ",".join(map(str, blocks)),
-            "is_completed": False
-        })
+        instruction_id = cls.db_handler.write(lambda conn: cls.store(conn, robot_id, blocks))
+        return cls.get_by_id(instruction_id)
+
+    @classmethod
+    def bulk_create(cls, rows: List[dict], returning: bool = False):
+        """Store many ``{"robot_id": ..., "blocks": [...]}`` rows, blocks included, in one transaction"""
+        if not rows:
+            return [] if returning else 0
+        ids = cls.db_handler.write(
+            lambda conn: [cls.store(conn, row["robot_id"], row["blocks"]) for row in rows]
+        )
+        return ids if returning else len(ids)
 
     @classmethod
     def get_active_for_robot(cls, robot_id: str) -> Optional[dict]:
@@ -46,7 +143,7 @@ class Telemetry(BaseModel):
             "ultrasonic_distance": distance,
             "current_line": line,
             "gripper_state": gripper,
-            "timestamp": datetime.now().isoformat()
+            "time_stamp": datetime.now().isoformat()
         })
 
 class Summary(BaseModel):
@@ -0,0 +1,117 @@
+import bisect
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+STATEMENT_TYPES = frozenset((
+    "SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH", "CREATE", "DROP",
+    "ALTER", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "EXPLAIN",
+))
+
+class Histogram:
+    """Fixed-bucket histogram; observing only increments preallocated counters"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Bucket counts as Prometheus expects them, each including the ones below"""
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+class QueryMetrics:
+    """Time spent in SQLite ``execute`` calls, per statement type.
+
+    The type of a statement is its first keyword. It is cached per SQL string,
+    and since queries are string constants the lookup is a single dict hit.
+    """
+
+    def __init__(self, max_cached_statements: int = 1024):
+        self.max_cached_statements = max_cached_statements
+        self.histograms: Dict[str, Histogram] = {}
+        # Set by QueryProfiler.enable(); takes over execute() while profiling
+        self.profiler = None
+        self._types: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def statement_type(self, sql: str) -> str:
+        kind = self._types.get(sql)
+        if kind is None:
+            words = sql.split(None, 1)
+            kind = words[0].upper() if words else ""
+            if kind not in STATEMENT_TYPES:
+                kind = "OTHER"
+            if len(self._types) < self.max_cached_statements:
+                self._types[sql] = kind
+        return kind
+
+    def observe(self, sql: str, seconds: float) -> None:
+        kind = self.statement_type(sql)
+        with self._lock:
+            histogram = self.histograms.get(kind)
+            if histogram is None:
+                histogram = self.histograms[kind] = Histogram()
+            histogram.observe(seconds)
+
+query_metrics = QueryMetrics()
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each ``execute`` to query_metrics.
+
+    For a SELECT this measures preparing the statement and computing the
+    first row; rows fetched afterwards are not included.
+    """
+
+    def execute(self, sql, parameters=()):
+        profiler = query_metrics.profiler
+        if profiler is not None:
+            return profiler.execute(self, sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_metrics.observe(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        profiler = query_metrics.profiler
+        if profiler is not None:
+            return profiler.executemany(self, sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_metrics.observe(sql, time.perf_counter() - start)
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose statements all go through a TimedCursor"""
+
+    def cursor(self, factory=None):
+        if factory is None:
+            profiler = query_metrics.profiler
+            factory = profiler.cursor_class if profiler is not None else TimedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
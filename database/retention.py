@@ -0,0 +1,166 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import logging
+
+from .db_handler import DatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+# Rollup table -> strftime() format of its bucket start
+ROLLUP_TABLES = {
+    "minute": ("telemetry_minute", "%Y-%m-%d %H:%M:00"),
+    "hour": ("telemetry_hour", "%Y-%m-%d %H:00:00"),
+}
+
+def _format_cutoff(age: timedelta) -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP, which telemetry rows default to
+    return (datetime.now(timezone.utc) - age).strftime("%Y-%m-%d %H:%M:%S")
+
+def _lines_from_mask(mask: int) -> List[int]:
+    return [line for line in range(63) if mask >> line & 1]
+
+def rollup_batch(conn: sqlite3.Connection, cutoff: str, batch_size: int) -> int:
+    """Fold the oldest raw telemetry rows older than ``cutoff`` into the rollups.
+
+    Works on at most ``batch_size`` rows, taken in id order and stopping at the
+    first row that is still inside the retention window. The rows are merged
+    into every rollup table and deleted in the same transaction, so each raw
+    sample is counted exactly once. Returns the number of rows removed.
+    """
+    rows = conn.execute("""
+        SELECT id, time_stamp IS NULL OR datetime(time_stamp) < datetime(?)
+        FROM telemetry ORDER BY id LIMIT ?
+    """, (cutoff, batch_size)).fetchall()
+    last_id = None
+    for row_id, expired in rows:
+        if not expired:
+            break
+        last_id = row_id
+    if last_id is None:
+        return 0
+
+    for table, bucket_format in ROLLUP_TABLES.values():
+        conn.execute(f"""
+            INSERT INTO {table}
+                (robot_id, bucket, samples, sum_speed, min_speed, max_speed,
+                 min_distance, lines_mask)
+            SELECT robot_id, strftime('{bucket_format}', time_stamp) AS bucket,
+                   COUNT(*), SUM(speed), MIN(speed), MAX(speed),
+                   MIN(CASE WHEN ultrasonic_distance >= 0 THEN ultrasonic_distance END),
+                   SUM(DISTINCT CASE WHEN CAST(current_line AS INTEGER) BETWEEN 0 AND 62
+                                     THEN 1 << CAST(current_line AS INTEGER) ELSE 0 END)
+            FROM telemetry
+            WHERE id <= ? AND time_stamp IS NOT NULL
+            GROUP BY robot_id, bucket
+            ON CONFLICT (robot_id, bucket) DO UPDATE SET
+                samples = samples + excluded.samples,
+                sum_speed = sum_speed + excluded.sum_speed,
+                min_speed = MIN(min_speed, excluded.min_speed),
+                max_speed = MAX(max_speed, excluded.max_speed),
+                min_distance = COALESCE(MIN(min_distance, excluded.min_distance),
+                                        min_distance, excluded.min_distance),
+                lines_mask = lines_mask | excluded.lines_mask
+        """, (last_id,))
+
+    return conn.execute("DELETE FROM telemetry WHERE id <= ?", (last_id,)).rowcount
+
+def prune_rollups(conn: sqlite3.Connection, table: str, cutoff: str, batch_size: int) -> int:
+    return conn.execute(f"""
+        DELETE FROM {table} WHERE rowid IN (
+            SELECT rowid FROM {table} WHERE bucket < ? LIMIT ?
+        )
+    """, (cutoff, batch_size)).rowcount
+
+class TelemetryRetention:
+    """Keeps raw telemetry for a fixed window and rolls older rows into aggregates.
+
+    Every ``interval`` seconds a background thread moves expired raw rows into
+    the per-minute and per-hour rollup tables. Each batch of ``batch_size``
+    rows is a separate writer transaction, so other writes are queued in
+    between and the write lock is never held for long. Minute rollups are
+    pruned after ``minute_retention``; hour rollups are kept unless
+    ``hour_retention`` is set.
+    """
+
+    def __init__(self, handler: DatabaseHandler, raw_retention: timedelta = timedelta(days=7),
+                 minute_retention: Optional[timedelta] = timedelta(days=90),
+                 hour_retention: Optional[timedelta] = None,
+                 batch_size: int = 1000, interval: float = 300.0):
+        self.handler = handler
+        self.raw_retention = raw_retention
+        self.minute_retention = minute_retention
+        self.hour_retention = hour_retention
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self) -> Dict[str, int]:
+        """Run one full retention pass and return how many rows each step removed"""
+        removed = {"telemetry": 0, "telemetry_minute": 0, "telemetry_hour": 0}
+
+        cutoff = _format_cutoff(self.raw_retention)
+        while not self._stop.is_set():
+            deleted = self.handler.write(
+                lambda conn: rollup_batch(conn, cutoff, self.batch_size)
+            )
+            removed["telemetry"] += deleted
+            if not deleted:
+                break
+
+        for resolution, retention in (("minute", self.minute_retention),
+                                      ("hour", self.hour_retention)):
+            if retention is None:
+                continue
+            table = ROLLUP_TABLES[resolution][0]
+            cutoff = _format_cutoff(retention)
+            while not self._stop.is_set():
+                deleted = self.handler.write(
+                    lambda conn: prune_rollups(conn, table, cutoff, self.batch_size)
+                )
+                removed[table] += deleted
+                if deleted < self.batch_size:
+                    break
+
+        if any(removed.values()):
+            logger.info(f"Telemetry retention removed {removed}")
+        return removed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Telemetry retention failed: {e}")
+            self._stop.wait(self.interval)
+
+def format_rollup(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a stored rollup row into the shape returned by the API"""
+    samples = row["samples"]
+    lines = _lines_from_mask(row["lines_mask"] or 0)
+    return {
+        "bucket": row["bucket"],
+        "samples": samples,
+        "avg_speed": row["sum_speed"] / samples if samples else None,
+        "min_speed": row["min_speed"],
+        "max_speed": row["max_speed"],
+        "min_distance": row["min_distance"],
+        "lines_visited": len(lines),
+        "lines": lines,
+    }
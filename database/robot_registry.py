@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import os
+
+class RobotRegistry:
+    """In-process cache of the robots table.
+
+    The robot set changes rarely, so readers are served from memory. Inserts
+    made through this process update the cache directly (write-through);
+    updates and deletes invalidate it so the next reader reloads. Changes
+    made by other processes show up once the snapshot is older than ``ttl``
+    seconds and the next reader reloads it.
+
+    ``version`` increases whenever the cached set changes, so callers can
+    skip work (re-rendering, re-sending) when it has not moved.
+
+    Each robot's ``slot`` column is a small, permanent number used by compact
+    telemetry records in place of the full robot id.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._robots: Dict[str, Dict[str, Any]] = {}
+        self._slots: Dict[int, str] = {}
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at >= self.ttl
+
+    def replace(self, robots: List[Dict[str, Any]], seen_version: int,
+                slots: Optional[Dict[int, str]] = None) -> None:
+        """Install a snapshot read from the database.
+
+        ``seen_version`` is the version read before querying; if a write-through
+        insert happened meanwhile the snapshot may miss it and is dropped.
+        ``slots`` maps slots to robot ids; when omitted the known slots are kept.
+        """
+        snapshot = {r["id"]: dict(r) for r in robots}
+        with self._lock:
+            if self._version != seen_version:
+                return
+            if snapshot != self._robots or (slots is not None and slots != self._slots):
+                self._robots = snapshot
+                if slots is not None:
+                    self._slots = dict(slots)
+                self._version += 1
+            self._loaded_at = time.monotonic()
+
+    def add(self, robot_id: str, name: str, created_at: str, slot: Optional[int] = None) -> None:
+        with self._lock:
+            robots = dict(self._robots)
+            robots[robot_id] = {"id": robot_id, "name": name, "created_at": created_at}
+            self._robots = robots
+            if slot is not None:
+                self._slots = {**self._slots, slot: robot_id}
+            self._version += 1
+
+    def invalidate(self) -> None:
+        """Force a reload; slots are forgotten too, so a deleted robot's slot stops resolving"""
+        with self._lock:
+            self._loaded_at = None
+            self._slots = {}
+
+    def __contains__(self, robot_id: str) -> bool:
+        return robot_id in self._robots
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._robots.values()]
+
+    def robot_for_slot(self, slot: int) -> Optional[str]:
+        return self._slots.get(slot)
+
+    def slot_for(self, robot_id: str) -> Optional[int]:
+        for slot, rid in self._slots.items():
+            if rid == robot_id:
+                return slot
+        return None
+
+robot_registry = RobotRegistry(ttl=float(os.getenv("ROBOT_REGISTRY_TTL", "30")))
@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the rows themselves; anything else is retried on the next flush
+DATA_ERRORS = (sqlite3.IntegrityError, ValueError, TypeError)
+
+class BufferFullError(Exception):
+    """Raised when the write-behind buffer cannot accept more samples"""
+
+class TelemetryBuffer:
+    """Write-behind buffer that groups telemetry rows into batched inserts.
+
+    Rows are appended by request handlers and written by a background thread
+    with a single ``writer`` call per flush, either every ``flush_interval``
+    seconds or as soon as ``flush_size`` rows are waiting. The buffer holds at
+    most ``max_size`` rows; once full, ``add`` raises ``BufferFullError`` so
+    callers can push back on the client instead of growing without bound.
+    """
+
+    def __init__(self, writer: Callable[[List[tuple]], int], max_size: int = 10000,
+                 flush_size: int = 500, flush_interval: float = 1.0):
+        self.writer = writer
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._rows: List[tuple] = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._rows)
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._run, name="telemetry-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still buffered"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def add(self, row: tuple) -> None:
+        self.add_many([row])
+
+    def add_many(self, rows: Sequence[tuple]) -> None:
+        self.start()
+        with self._cond:
+            if len(self._rows) + len(rows) > self.max_size:
+                raise BufferFullError(
+                    f"Telemetry buffer full ({len(self._rows)}/{self.max_size} rows)"
+                )
+            self._rows.extend(rows)
+            if len(self._rows) >= self.flush_size:
+                self._cond.notify()
+
+    def flush(self) -> int:
+        with self._cond:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            return self.writer(rows)
+        except DATA_ERRORS as e:
+            logger.error(f"Error flushing {len(rows)} telemetry rows: {e}")
+        except Exception as e:
+            # Locked database, full writer queue...: keep the rows for the next flush
+            logger.error(f"Error flushing {len(rows)} telemetry rows, will retry: {e}")
+            self._requeue(rows)
+            return 0
+        # A row the table rejects: retry one at a time so it cannot hold back the others
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                written += self.writer([row])
+            except DATA_ERRORS as e:
+                logger.error(f"Dropping telemetry row {row!r}: {e}")
+            except Exception as e:
+                logger.error(f"Error flushing telemetry rows, will retry: {e}")
+                self._requeue(rows[i:])
+                break
+        return written
+
+    def _requeue(self, rows: List[tuple]) -> None:
+        """Put rows back in front of the buffer, keeping as many as still fit"""
+        with self._cond:
+            room = max(self.max_size - len(self._rows), 0)
+            if room < len(rows):
+                logger.error(f"Dropping {len(rows) - room} telemetry rows")
+            self._rows[:0] = rows[:room]
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while self._running and len(self._rows) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._running:
+                    return
+            self.flush()
+            deadline = time.monotonic() + self.flush_interval
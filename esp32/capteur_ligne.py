@@ -1,10 +1,65 @@
 from machine import Pin
+from array import array
+from time import ticks_ms, ticks_diff
+import micropython
+
+# Lets exceptions raised inside hard IRQ handlers be reported
+micropython.alloc_emergency_exception_buf(100)
 
 class LineSensor:
-    def __init__(self, d0_pin):
+    # With irq=True every edge is timestamped by a hard IRQ handler and stored
+    # in a preallocated ring, so transitions are never missed when the control
+    # loop is late. Edges closer than debounce_ms to the previous accepted
+    # edge are ignored.
+    def __init__(self, d0_pin, irq=False, debounce_ms=5, capacity=32):
         self.d0 = Pin(d0_pin, Pin.IN)
+        self.irq = irq
+        if irq:
+            self.debounce_ms = debounce_ms
+            self.capacity = capacity
+            self.times = array('i', [0] * capacity)
+            self.values = bytearray(capacity)
+            self.time = 0      # timestamp of the edge returned by next_edge()
+            self.dropped = 0   # edges lost because the ring was full
+            self._write = 0
+            self._read = 0
+            self._last_time = ticks_ms()
+            self._last_value = self.d0.value()
+            self.d0.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING,
+                        handler=self._on_edge, hard=True)
 
     def line_detected(self):
         # Returns True if line is detected (usually D0 goes LOW on black line)
         return self.d0.value() == 1
-      
+
+    def _on_edge(self, pin):
+        # Hard IRQ context: no allocation, integers only
+        now = ticks_ms()
+        value = pin.value()
+        if value == self._last_value or ticks_diff(now, self._last_time) < self.debounce_ms:
+            return
+        following = (self._write + 1) % self.capacity
+        if following == self._read:
+            self.dropped += 1
+            return
+        self.times[self._write] = now
+        self.values[self._write] = value
+        self._last_time = now
+        self._last_value = value
+        self._write = following
+
+    def next_time(self):
+        # Timestamp of the oldest unread edge, or None
+        if self._read == self._write:
+            return None
+        return self.times[self._read]
+
+    def next_edge(self):
+        # Consumes the oldest edge: returns its value (0/1) and sets self.time,
+        # or returns -1 when there is none
+        if self._read == self._write:
+            return -1
+        self.time = self.times[self._read]
+        value = self.values[self._read]
+        self._read = (self._read + 1) % self.capacity
+        return value
@@ -0,0 +1,143 @@
+import asyncio
+from time import ticks_ms, ticks_diff, ticks_add
+import config
+
+TYPE_JSON = b"application/json"
+TYPE_BINAIRE = b"application/octet-stream"
+
+
+class ClientHTTP:
+    # Client HTTP/1.1 sur une seule connexion persistante (keep-alive).
+    # Les requêtes sont sérialisées par un verrou ; l'entête de chaque
+    # requête est écrit dans un tampon préalloué. Après un échec la
+    # connexion est fermée, et la reconnexion n'est retentée qu'après un
+    # délai qui double à chaque échec (RECONNEXION_MIN_MS..MAX_MS).
+    def __init__(self, hote=config.SERVEUR_HOTE, port=config.SERVEUR_PORT):
+        self.hote = hote
+        self.port = port
+        self._entete_hote = b"Host: %s:%d\r\nConnection: keep-alive\r\nContent-Type: " % (hote.encode(), port)
+        self._tampon = bytearray(config.TAILLE_ENTETE_REQUETE)
+        self._vue = memoryview(self._tampon)
+        self._verrou = asyncio.Lock()
+        self._lecteur = None
+        self._ecrivain = None
+        self._attente_ms = 0
+        self._prochain_essai = ticks_ms()
+        self.requetes = 0
+        self.connexions = 0
+
+    async def _connecter(self, delai):
+        if self._attente_ms and ticks_diff(self._prochain_essai, ticks_ms()) > 0:
+            raise OSError("reconnexion différée")
+        try:
+            self._lecteur, self._ecrivain = await asyncio.wait_for(
+                asyncio.open_connection(self.hote, self.port), delai
+            )
+        except Exception:
+            self._echec()
+            raise
+        self.connexions += 1
+
+    def _echec(self):
+        self._attente_ms = min(max(self._attente_ms * 2, config.RECONNEXION_MIN_MS),
+                               config.RECONNEXION_MAX_MS)
+        self._prochain_essai = ticks_add(ticks_ms(), self._attente_ms)
+
+    async def fermer(self):
+        ecrivain = self._ecrivain
+        self._lecteur = self._ecrivain = None
+        if ecrivain is not None:
+            try:
+                ecrivain.close()
+                await ecrivain.wait_closed()
+            except Exception:
+                pass
+
+    def _preparer(self, methode, chemin, type_contenu, longueur):
+        # Écrit « METHODE chemin HTTP/1.1 » et les entêtes dans le tampon
+        vue = self._vue
+        position = 0
+        for morceau in (methode, b" ", chemin, b" HTTP/1.1\r\n", self._entete_hote,
+                        type_contenu, b"\r\nContent-Length: "):
+            fin = position + len(morceau)
+            vue[position:fin] = morceau
+            position = fin
+        position = _ecrire_entier(self._tampon, position, longueur)
+        vue[position:position + 4] = b"\r\n\r\n"
+        return vue[:position + 4]
+
+    async def _echanger(self, entete, corps, delai):
+        ecrivain = self._ecrivain
+        lecteur = self._lecteur
+        ecrivain.write(entete)
+        if corps:
+            ecrivain.write(corps)
+        await asyncio.wait_for(ecrivain.drain(), delai)
+
+        ligne = await asyncio.wait_for(lecteur.readline(), delai)
+        if not ligne:
+            raise OSError("connexion fermée par le serveur")
+        code = int(ligne[9:12])
+        longueur = None
+        fermer = False
+        while True:
+            ligne = await asyncio.wait_for(lecteur.readline(), delai)
+            if not ligne:
+                raise OSError("connexion fermée par le serveur")
+            if ligne == b"\r\n":
+                break
+            nom = ligne[:ligne.find(b":")].lower()
+            if nom == b"content-length":
+                longueur = int(ligne[15:])
+            elif nom == b"connection" and b"close" in ligne.lower():
+                fermer = True
+
+        if longueur is None:
+            reponse = await asyncio.wait_for(lecteur.read(-1), delai)
+            fermer = True
+        elif longueur:
+            reponse = await asyncio.wait_for(lecteur.readexactly(longueur), delai)
+        else:
+            reponse = b""
+        return code, reponse, fermer
+
+    async def requete(self, methode, chemin, corps=b"", type_contenu=TYPE_JSON, delai=config.DELAI_REQUETE_S):
+        # methode et chemin en bytes ; retourne (code, corps de la réponse)
+        async with self._verrou:
+            entete = self._preparer(methode, chemin, type_contenu, len(corps))
+            # Une connexion réutilisée peut avoir été fermée par le serveur
+            # pendant qu'elle était inactive : dans ce cas on réessaie une fois
+            for essai in range(2):
+                reutilisee = self._ecrivain is not None
+                if not reutilisee:
+                    await self._connecter(delai)
+                try:
+                    code, reponse, fermer = await self._echanger(entete, corps, delai)
+                except Exception:
+                    await self.fermer()
+                    if reutilisee and essai == 0:
+                        continue
+                    self._echec()
+                    raise
+                self._attente_ms = 0
+                self.requetes += 1
+                if fermer:
+                    await self.fermer()
+                return code, reponse
+
+
+def _ecrire_entier(tampon, position, valeur):
+    # Écrit un entier positif en décimal dans tampon, sans allocation
+    debut = position
+    while True:
+        tampon[position] = 48 + valeur % 10
+        position += 1
+        valeur //= 10
+        if not valeur:
+            break
+    fin = position - 1
+    while debut < fin:
+        tampon[debut], tampon[fin] = tampon[fin], tampon[debut]
+        debut += 1
+        fin -= 1
+    return position
@@ -0,0 +1,13 @@
+# Configuration du robot : réseau, serveur et identité, en un seul endroit
+WIFI_SSID = "IMERIR Fablab"
+WIFI_MOT_DE_PASSE = "imerir66"
+
+SERVEUR_HOTE = "10.7.5.119"
+SERVEUR_PORT = 8000
+ROBOT_ID = "255f30bc-46f7-41d4-ba1d-db76a0afd7f7"
+
+# Client HTTP persistant (client_http.py)
+DELAI_REQUETE_S = 10          # délai max par étape d'une requête (hors long-poll)
+RECONNEXION_MIN_MS = 500      # premier délai avant de retenter une connexion
+RECONNEXION_MAX_MS = 16000    # plafond du recul exponentiel
+TAILLE_ENTETE_REQUETE = 256   # tampon préalloué pour la ligne de requête et les entêtes
@@ -1,33 +1,64 @@
 # main.py
-from time import sleep
-from reseau import connecter_wifi, recuperer_instruction, envoyer_summary
-from mission import executer_mission_par_ligne, reset_ligne_actuelle
-from machine import Pin, PWM
-from motor_driver import DCMotor
-from capteur_ligne import LineSensor
+import asyncio
+import config
+from reseau import (connecter_wifi, recuperer_instruction, envoyer_summary, recuperer_slot,
+                    configurer_telemetrie, etape_envoi_telemetrie)
+from mission import (executer_mission_par_ligne, reset_ligne_actuelle, vitesse_moyenne,
+                     etape_suivi_ligne, etape_ultrason, etape_telemetrie)
+from ordonnanceur import MesureBoucle, boucle_periodique, tache_rapport
 
+ATTENTE_INSTRUCTION = 30  # secondes de long-poll côté serveur
 
+# Période de chaque tâche, en millisecondes
+PERIODES_MS = {
+    "suivi_ligne": 10,    # capteurs de ligne + moteurs
+    "ultrason": 100,      # mesure de distance
+    "telemetrie": 250,    # échantillon dans l'anneau de télémétrie
+    "envoi": 1000,        # envoi des lots de télémétrie
+    "instructions": 1000, # reprise du long-poll après une réponse ou une erreur
+}
+PERIODE_RAPPORT_MS = 10000  # affichage des mesures de cadence
 
-def main():
-    reset_ligne_actuelle()  # Reset current line to 1 on boot
-    connecter_wifi("IMERIR Fablab", "imerir66")
 
-    instruction = None
-    while not instruction or "blocks" not in instruction or not instruction["blocks"]:
-        print("ð Waiting for instructions from server...")
-        instruction = recuperer_instruction()
-        sleep(1)
+async def etape_instructions():
+    print("ð Waiting for instructions from server...")
+    instruction = await recuperer_instruction(attente=ATTENTE_INSTRUCTION)
+    if not instruction or "blocks" not in instruction or not instruction["blocks"]:
+        return
 
     print("ð Instruction received:", instruction)
 
     for ligne in instruction["blocks"]:
         print(f"ð¯ Executing mission for line: {ligne}")
-        executer_mission_par_ligne(ligne)
-        sleep(1)  # Small delay between missions
+        await executer_mission_par_ligne(ligne)
+        await asyncio.sleep(1)  # Small delay between missions
 
     print("â Mission complete. Sending summary.")
-    envoyer_summary()
+    await envoyer_summary(vitesse_moyenne=vitesse_moyenne())
+
+
+async def main():
+    reset_ligne_actuelle()  # Reset current line to 1 on boot
+    connecter_wifi(config.WIFI_SSID, config.WIFI_MOT_DE_PASSE)
+
+    taches = [
+        ("suivi_ligne", etape_suivi_ligne),
+        ("ultrason", etape_ultrason),
+        ("instructions", etape_instructions),
+    ]
+    slot = await recuperer_slot()
+    if slot is not None:
+        configurer_telemetrie(slot)
+        taches.append(("telemetrie", etape_telemetrie))
+        taches.append(("envoi", etape_envoi_telemetrie))
+
+    mesures = []
+    for nom, etape in taches:
+        mesure = MesureBoucle(nom, PERIODES_MS[nom])
+        mesures.append(mesure)
+        asyncio.create_task(boucle_periodique(mesure, etape))
+    await tache_rapport(mesures, PERIODE_RAPPORT_MS)
 
 # Call main() directly so it runs on boot
-main()
-#test_capteurs_et_moteurs()
\ No newline at end of file
+asyncio.run(main())
+#test_capteurs_et_moteurs()
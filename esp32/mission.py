@@ -1,12 +1,17 @@
-from time import sleep, ticks_ms, ticks_diff
+import asyncio
+from time import ticks_ms, ticks_diff, ticks_add
 from machine import Pin, PWM
 from motor_driver import DCMotor
 from capteur_ligne import LineSensor
-from reseau import envoyer_telemetrie
+from reseau import enregistrer_telemetrie
 from ultrason import Ultrason
 
 VITESSE_SUIVI_LIGNE = 70
 VITESSE_CORRECTION = 50
+DUREE_CORRECTION_MS = 50   # durée minimale d'une correction gauche/droite
+PAUSE_CROISEMENT_MS = 200  # arrêt court après chaque ligne traversée
+RAMPE_MOTEURS = 10         # accélération au démarrage, en % de vitesse par itération
+LIGNE_PAR_IRQ = True       # compter les lignes sur interruptions plutôt qu'en scrutant
 
 Ultrason_comp = Ultrason(22, 23)
 
@@ -18,11 +23,11 @@ in4 = Pin(27, Pin.OUT)
 enable_pwm_left = PWM(Pin(25), freq=1000)
 enable_pwm_right = PWM(Pin(26), freq=1000)
 
-right_motor = DCMotor(in1, in2, enable_pwm_right)
-left_motor = DCMotor(in3, in4, enable_pwm_left)
+right_motor = DCMotor(in1, in2, enable_pwm_right, ramp_step=RAMPE_MOTEURS)
+left_motor = DCMotor(in3, in4, enable_pwm_left, ramp_step=RAMPE_MOTEURS)
 
-suiveur_gauche = LineSensor(19)
-suiveur_droite = LineSensor(18)
+suiveur_gauche = LineSensor(19, irq=LIGNE_PAR_IRQ)
+suiveur_droite = LineSensor(18, irq=LIGNE_PAR_IRQ)
 
 ligne_actuelle = 1
 sens_horaire = True
@@ -44,15 +49,26 @@ def load_ligne_actuelle():
 def reset_ligne_actuelle():
     global ligne_actuelle
     ligne_actuelle = 1
+    etat.compteur = ligne_actuelle
     save_ligne_actuelle(ligne_actuelle)
 
 def stop():
     left_motor.stop()
     right_motor.stop()
 
+def _avancer_moteur(moteur):
+    # Démarrage progressif depuis l'arrêt : la rampe (appliquée par update())
+    # continue jusqu'à la vitesse de suivi ; après une correction, direct
+    if moteur.speed == VITESSE_SUIVI_LIGNE:
+        return
+    if moteur.speed == 0 or (moteur.speed > 0 and moteur.target == VITESSE_SUIVI_LIGNE):
+        moteur.ramp_to(VITESSE_SUIVI_LIGNE)
+    else:
+        moteur.forward(VITESSE_SUIVI_LIGNE)
+
 def avancer():
-    left_motor.forward(VITESSE_SUIVI_LIGNE)
-    right_motor.forward(VITESSE_SUIVI_LIGNE)
+    _avancer_moteur(left_motor)
+    _avancer_moteur(right_motor)
 
 def turn_left():
     left_motor.forward(VITESSE_CORRECTION)
@@ -77,69 +93,87 @@ def etat_suiveur():
     else:
         return "AVANCER"  # No sensor detects line â go forward
 
-def suivre_ligne(ligne_cible):
-    global ligne_actuelle, sens_horaire
-
-    compteur = ligne_actuelle
-    ligne_detectee = False
-    derniere_detection = ticks_ms()
-    derniere_telemetrie = ticks_ms()
-
-    print(f"ð Navigating: current={ligne_actuelle} â target={ligne_cible}")
+# État partagé entre les tâches ; chaque champ n'est écrit que par une tâche
+class EtatRobot:
+    def __init__(self):
+        self.compteur = ligne_actuelle
+        self.cible = None          # ligne visée, None quand aucune mission
+        self.statut = "STOP"
+        self.vitesse = 0
+        self.distance = -1         # dernière mesure de etape_ultrason
+        self.pince_active = False
+        self.arrivee = asyncio.Event()
+        self.somme_vitesse = 0
+        self.nombre_vitesse = 0
+
+etat = EtatRobot()
+
+# Suivi de ligne d'une itération à l'autre : les anciens sleep() sont
+# remplacés par des échéances pour que l'étape ne bloque jamais
+_ligne_detectee = False
+_pause_jusqu_a = None
+_correction_jusqu_a = None
+
+# Mode IRQ : état de chaque capteur reconstruit à partir des fronts horodatés
+_gauche_sur_ligne = 0
+_droite_sur_ligne = 0
+
+def _front_suivant():
+    # Applique le plus ancien front des deux capteurs ; False s'il n'y en a plus
+    global _gauche_sur_ligne, _droite_sur_ligne
+    tg = suiveur_gauche.next_time()
+    td = suiveur_droite.next_time()
+    if tg is None and td is None:
+        return False
+    if td is None or (tg is not None and ticks_diff(tg, td) <= 0):
+        _gauche_sur_ligne = suiveur_gauche.next_edge()
+    else:
+        _droite_sur_ligne = suiveur_droite.next_edge()
+    return True
+
+def _croisement_irq():
+    # Consomme les fronts jusqu'au prochain instant où les deux capteurs
+    # voient la ligne ; les fronts suivants restent pour l'itération suivante
+    while True:
+        deux_avant = _gauche_sur_ligne and _droite_sur_ligne
+        if not _front_suivant():
+            return False
+        if _gauche_sur_ligne and _droite_sur_ligne and not deux_avant:
+            return True
+
+def _vider_fronts():
+    # Oublie les fronts reçus hors mission (robot déplacé à la main, etc.)
+    global _gauche_sur_ligne, _droite_sur_ligne
+    while _front_suivant():
+        pass
+    _gauche_sur_ligne = suiveur_gauche.d0.value()
+    _droite_sur_ligne = suiveur_droite.d0.value()
+
+def _ligne_traversee(etat_capteurs):
+    # Vrai si une nouvelle ligne a été traversée depuis le dernier appel
+    global _ligne_detectee
+    if LIGNE_PAR_IRQ:
+        return _croisement_irq()
+    if etat_capteurs == "LIGNE":
+        if not _ligne_detectee:
+            _ligne_detectee = True
+            return True
+    else:
+        _ligne_detectee = False  # prÃªt Ã  dÃ©tecter prochaine ligne
+    return False
 
-    while compteur != ligne_cible:
-        now = ticks_ms()
-        etat = etat_suiveur()
-
-        # Envoyer la tÃ©lÃ©metrie toutes les 1s
-        if ticks_diff(now, derniere_telemetrie) >= 1000:
-            envoyer_telemetrie(
-                ultrason_distance=Ultrason_comp.distance_cm(),
-                ligne=compteur,
-                vitesse=VITESSE_SUIVI_LIGNE,
-                statut="MOVING",
-                pince_active=False
-            )
-            derniere_telemetrie = now
-
-        # DÃ©tection de ligne traversÃ©e (double capteur)
-        if etat == "LIGNE" and not ligne_detectee:
-            compteur = compteur + 1 if sens_horaire else compteur - 1
-            compteur = (compteur - 1) % 10 + 1  # wrap 1..10
-            ligne_detectee = True
-            print(f"â Line crossed, count = {compteur}")
-            stop()
-            sleep(0.2)  # Court arrÃªt pour fiabilitÃ©
-        elif etat != "LIGNE":
-            ligne_detectee = False  # prÃªt Ã  dÃ©tecter prochaine ligne
-
-        # Mouvement principal basÃ© sur les capteurs
-        if etat == "AVANCER":
-            avancer()
-
-        elif etat == "GAUCHE":
-            print("âªï¸ Correction gauche")
-            turn_left()
-            sleep(0.05)
-
-        elif etat == "DROITE":
-            print("â©ï¸ Correction droite")
-            turn_right()
-            sleep(0.05)
-
-        else:
-            # SÃ©curitÃ© par dÃ©faut
-            avancer()
-
-        sleep(0.01)
-
-    ligne_actuelle = compteur
+def _arrivee():
+    global ligne_actuelle
+    ligne_actuelle = etat.compteur
     save_ligne_actuelle(ligne_actuelle)
     stop()
+    etat.cible = None
+    etat.statut = "STOP"
+    etat.vitesse = 0
 
     # TÃ©lÃ©metrie finale
-    envoyer_telemetrie(
-        ultrason_distance=Ultrason_comp.distance_cm(),
+    enregistrer_telemetrie(
+        ultrason_distance=etat.distance,
         ligne=ligne_actuelle,
         vitesse=0,
         statut="STOP",
@@ -147,8 +181,103 @@ def suivre_ligne(ligne_cible):
     )
 
     print("ð Arrived at line", ligne_actuelle)
+    etat.arrivee.set()
+
+async def etape_suivi_ligne():
+    # Tâche rapide : une itération du suivi de ligne et de la commande moteurs
+    global _pause_jusqu_a, _correction_jusqu_a
+    if etat.cible is None:
+        return
+    now = ticks_ms()
+
+    if _pause_jusqu_a is not None:
+        if ticks_diff(_pause_jusqu_a, now) > 0:
+            return
+        _pause_jusqu_a = None
+
+    if etat.compteur == etat.cible:
+        _arrivee()
+        return
+
+    left_motor.update()
+    right_motor.update()
+    etat.somme_vitesse += etat.vitesse
+    etat.nombre_vitesse += 1
+    etat_capteurs = etat_suiveur()
+
+    # DÃ©tection de ligne traversÃ©e (double capteur)
+    if _ligne_traversee(etat_capteurs):
+        compteur = etat.compteur + 1 if sens_horaire else etat.compteur - 1
+        compteur = (compteur - 1) % 10 + 1  # wrap 1..10
+        etat.compteur = compteur
+        print(f"â Line crossed, count = {compteur}")
+        stop()
+        _pause_jusqu_a = ticks_add(now, PAUSE_CROISEMENT_MS)  # Court arrÃªt pour fiabilitÃ©
+        return
+
+    # Une correction en cours continue jusqu'à son échéance
+    if _correction_jusqu_a is not None:
+        if ticks_diff(_correction_jusqu_a, now) > 0:
+            return
+        _correction_jusqu_a = None
+
+    # Mouvement principal basÃ© sur les capteurs
+    etat.statut = "MOVING"
+    if etat_capteurs == "AVANCER":
+        avancer()
+        etat.vitesse = left_motor.speed  # inférieure à la consigne pendant la rampe
+
+    elif etat_capteurs == "GAUCHE":
+        print("âªï¸ Correction gauche")
+        turn_left()
+        etat.vitesse = VITESSE_CORRECTION
+        _correction_jusqu_a = ticks_add(now, DUREE_CORRECTION_MS)
+
+    elif etat_capteurs == "DROITE":
+        print("â©ï¸ Correction droite")
+        turn_right()
+        etat.vitesse = VITESSE_CORRECTION
+        _correction_jusqu_a = ticks_add(now, DUREE_CORRECTION_MS)
+
+    else:
+        # SÃ©curitÃ© par dÃ©faut
+        avancer()
+        etat.vitesse = left_motor.speed  # inférieure à la consigne pendant la rampe
+
+async def etape_ultrason():
+    etat.distance = await Ultrason_comp.distance_cm_async()
+
+async def etape_telemetrie():
+    # Échantillon à cadence fixe dans l'anneau ; etape_envoi_telemetrie l'envoie
+    if etat.cible is None:
+        return
+    enregistrer_telemetrie(
+        ultrason_distance=etat.distance,
+        ligne=etat.compteur,
+        vitesse=etat.vitesse,
+        statut=etat.statut,
+        pince_active=etat.pince_active
+    )
+
+def vitesse_moyenne():
+    # Vitesse commandée moyenne depuis le dernier appel (pour le résumé de mission)
+    if not etat.nombre_vitesse:
+        return 0.0
+    moyenne = etat.somme_vitesse / etat.nombre_vitesse
+    etat.somme_vitesse = 0
+    etat.nombre_vitesse = 0
+    return moyenne
+
+async def suivre_ligne(ligne_cible):
+    # Confie la cible à etape_suivi_ligne et attend l'arrivée
+    print(f"ð Navigating: current={ligne_actuelle} â target={ligne_cible}")
+    etat.arrivee.clear()
+    if LIGNE_PAR_IRQ:
+        _vider_fronts()
+    etat.cible = ligne_cible
+    await etat.arrivee.wait()
 
 
-def executer_mission_par_ligne(ligne_recue):
+async def executer_mission_par_ligne(ligne_recue):
     print(f"ð§­ Moving to line: {ligne_recue}")
-    suivre_ligne(ligne_recue)
+    await suivre_ligne(ligne_recue)
@@ -1,32 +1,79 @@
+from array import array
+
 class DCMotor:
-    def __init__(self, pin1, pin2, enable_pin, min_duty=750, max_duty=1023):
+    # Duty values for speeds 0..100 are computed once here, so commands only
+    # index an array('H') and never do float math (or allocate) in the loop.
+    # ramp_to()/update() accelerate towards a signed target speed by at most
+    # ramp_step speed units per update.
+    def __init__(self, pin1, pin2, enable_pin, min_duty=750, max_duty=1023, ramp_step=5):
         self.pin1 = pin1
         self.pin2 = pin2
         self.enable_pin = enable_pin
         self.min_duty = min_duty
         self.max_duty = max_duty
+        self.ramp_step = ramp_step
+        self.duty_table = array('H', (self._compute_duty(speed) for speed in range(101)))
+        self.speed = 0    # current signed speed, negative = backwards
+        self.target = 0
+
+    def _compute_duty(self, speed):
+        if speed <= 0 or speed > 100:
+            return 0
+        return int(self.min_duty + (self.max_duty - self.min_duty) * ((speed - 1) / (100 - 1)))
 
     def magnetic_stop(self, speed):
         self.enable_pin.duty(self.duty_cycle(speed))
         self.pin1.value(1)
         self.pin2.value(1)
+        self.speed = self.target = 0
 
     def forward(self, speed):
         self.enable_pin.duty(self.duty_cycle(speed))
         self.pin1.value(1)
         self.pin2.value(0)
+        self.speed = self.target = speed
 
     def backwards(self, speed):
         self.enable_pin.duty(self.duty_cycle(speed))
         self.pin1.value(0)
         self.pin2.value(1)
+        self.speed = self.target = -speed
 
     def stop(self):
         self.enable_pin.duty(0)
         self.pin1.value(0)
         self.pin2.value(0)
+        self.speed = self.target = 0
 
     def duty_cycle(self, speed):
         if speed <= 0 or speed > 100:
             return 0
-        return int(self.min_duty + (self.max_duty - self.min_duty) * ((speed - 1) / (100 - 1)))
+        return self.duty_table[int(speed)]
+
+    def ramp_to(self, speed):
+        # Signed target speed (-100..100), reached progressively by update()
+        self.target = speed
+
+    def update(self):
+        # Call once per control tick; steps the speed towards the target
+        speed = self.speed
+        target = self.target
+        if speed == target:
+            return
+        if target > speed:
+            speed = min(speed + self.ramp_step, target)
+        else:
+            speed = max(speed - self.ramp_step, target)
+        if speed > 0:
+            self.enable_pin.duty(self.duty_cycle(speed))
+            self.pin1.value(1)
+            self.pin2.value(0)
+        elif speed < 0:
+            self.enable_pin.duty(self.duty_cycle(-speed))
+            self.pin1.value(0)
+            self.pin2.value(1)
+        else:
+            self.enable_pin.duty(0)
+            self.pin1.value(0)
+            self.pin2.value(0)
+        self.speed = speed
@@ -0,0 +1,62 @@
+import asyncio
+from time import ticks_us, ticks_diff, ticks_add
+
+
+class MesureBoucle:
+    # Mesures de cadence d'une tâche périodique, en entiers (µs) pour ne
+    # pas allouer de flottants dans la boucle
+    def __init__(self, nom, periode_ms):
+        self.nom = nom
+        self.periode_ms = periode_ms
+        self.remettre_a_zero()
+
+    def remettre_a_zero(self):
+        self.iterations = 0
+        self.retard_max_us = 0    # réveil en retard sur l'échéance prévue
+        self.duree_max_us = 0     # durée d'une itération
+        self.duree_totale_us = 0
+        self.depassements = 0     # itérations plus longues que la période
+
+    def enregistrer(self, retard_us, duree_us):
+        self.iterations += 1
+        if retard_us > self.retard_max_us:
+            self.retard_max_us = retard_us
+        if duree_us > self.duree_max_us:
+            self.duree_max_us = duree_us
+        self.duree_totale_us += duree_us
+        if duree_us > self.periode_ms * 1000:
+            self.depassements += 1
+
+    def rapport(self):
+        moyenne = self.duree_totale_us // self.iterations if self.iterations else 0
+        return (f"{self.nom}: {self.iterations} it, période {self.periode_ms} ms, "
+                f"durée moy {moyenne} µs max {self.duree_max_us} µs, "
+                f"retard max {self.retard_max_us} µs, dépassements {self.depassements}")
+
+
+async def boucle_periodique(mesure, etape):
+    # Appelle `await etape()` toutes les mesure.periode_ms, sur des échéances
+    # fixes (pas de dérive). Si une itération déborde, on repart de
+    # maintenant au lieu d'enchaîner les itérations en retard.
+    periode_us = mesure.periode_ms * 1000
+    echeance = ticks_us()
+    while True:
+        debut = ticks_us()
+        await etape()
+        mesure.enregistrer(max(0, ticks_diff(debut, echeance)), ticks_diff(ticks_us(), debut))
+
+        echeance = ticks_add(echeance, periode_us)
+        attente_us = ticks_diff(echeance, ticks_us())
+        if attente_us < 0:
+            echeance = ticks_us()
+            attente_us = 0
+        await asyncio.sleep_ms(attente_us // 1000)
+
+
+async def tache_rapport(mesures, periode_ms):
+    # Affiche et remet à zéro les mesures de chaque tâche
+    while True:
+        await asyncio.sleep_ms(periode_ms)
+        for mesure in mesures:
+            print("⏱️", mesure.rapport())
+            mesure.remettre_a_zero()
@@ -1,7 +1,22 @@
 import network
-import urequests
 import json
-from time import sleep
+from time import sleep, ticks_ms, ticks_diff, ticks_add
+from telemetrie import TamponTelemetrie
+from client_http import ClientHTTP, TYPE_BINAIRE
+from config import ROBOT_ID
+
+# Deux connexions persistantes : le long-poll des instructions occupe la
+# sienne jusqu'à 30 s, la télémétrie et le résumé partagent l'autre
+client_instructions = ClientHTTP()
+client_donnees = ClientHTTP()
+CHEMIN_TELEMETRIE = b"/telemetry/packed"
+CHEMIN_SUMMARY = b"/summary"
+
+# Tampon circulaire de télémétrie, créé par configurer_telemetrie()
+_tampon = None
+ATTENTE_MAX_ENVOI_MS = 16000  # plafond du recul après des échecs d'envoi
+_attente_envoi_ms = 0
+_prochain_envoi = 0
 
 # ➤ Connect to Wi-Fi
 def connecter_wifi(ssid, password):
@@ -15,49 +30,87 @@ def connecter_wifi(ssid, password):
             sleep(0.5)
     print("\n✅ Connecté avec IP :", wlan.ifconfig()[0])
 
-# ➤ Send telemetry data to server
-def envoyer_telemetrie(robot_id="255f30bc-46f7-41d4-ba1d-db76a0afd7f7", ligne=False, vitesse=0, statut="STOP", pince_active=False):
-    url = "http://10.7.5.119:8000/telemetry"
-    data = {
-        "robot_id": robot_id,
-        "vitesse": vitesse,
-        "distance_ultrasons": 0.0,  # You can update this before calling if needed
-        "statut_deplacement": statut,
-        "ligne": ligne,
-        "pince_active": pince_active
-    }
+# ➤ Get the robot's numeric slot used in binary telemetry
+async def recuperer_slot(robot_id=ROBOT_ID):
     try:
-        res = urequests.post(url, json=data)
-        print("📡 Télémetrie envoyée :", res.status_code)
-        res.close()
+        code, reponse = await client_donnees.requete(b"GET", f"/robots/{robot_id}/slot".encode())
+        if code == 200:
+            return json.loads(reponse)["slot"]
+        print("⚠️ Mauvaise réponse :", code)
+    except Exception as e:
+        print("❌ Erreur slot :", e)
+    return None
+
+# ➤ Create the telemetry ring buffer
+def configurer_telemetrie(slot, capacite=256, lot=32):
+    global _tampon
+    _tampon = TamponTelemetrie(slot, capacite, lot)
+
+# ➤ Send packed telemetry records (many samples per request)
+async def envoyer_paquet(paquet):
+    try:
+        code, _ = await client_donnees.requete(b"POST", CHEMIN_TELEMETRIE, paquet, TYPE_BINAIRE)
+        print("📡 Télémetrie envoyée :", code)
+        return code == 200
     except Exception as e:
         print("❌ Erreur télémétrie :", e)
+        return False
+
+# ➤ Telemetry uplink step (periodic task)
+# Vide l'anneau par lots quand le Wi-Fi est disponible, avec un recul
+# exponentiel après un échec. Un lot n'est retiré de l'anneau qu'une fois
+# accepté par le serveur.
+async def etape_envoi_telemetrie():
+    global _attente_envoi_ms, _prochain_envoi
+    tampon = _tampon
+    if tampon is None or not tampon.en_attente():
+        return
+    if _attente_envoi_ms and ticks_diff(_prochain_envoi, ticks_ms()) > 0:
+        return
+    if not network.WLAN(network.STA_IF).isconnected():
+        return
+    while tampon.en_attente():
+        debut, nombre, paquet = tampon.preparer_lot()
+        if not await envoyer_paquet(paquet):
+            _attente_envoi_ms = min(max(_attente_envoi_ms * 2, 1000), ATTENTE_MAX_ENVOI_MS)
+            _prochain_envoi = ticks_add(ticks_ms(), _attente_envoi_ms)
+            return
+        tampon.confirmer_lot(debut, nombre)
+        _attente_envoi_ms = 0
+        if tampon.en_attente() < tampon.envoi.capacite:
+            return  # pas de lot complet en attente : on attend la prochaine période
+
+# ➤ Record a telemetry sample (sent later by the uplink task, never blocks)
+def enregistrer_telemetrie(ligne=0, vitesse=0, statut="STOP", pince_active=False, ultrason_distance=-1):
+    if _tampon is not None:
+        _tampon.enregistrer(ligne, vitesse, ultrason_distance, statut == "MOVING", pince_active)
 
 # ➤ Get instructions from server
-def recuperer_instruction(robot_id="255f30bc-46f7-41d4-ba1d-db76a0afd7f7"):
-    url = f"http://10.7.5.119:8000/instructions?robot_id={robot_id}"
+# attente > 0 : le serveur garde la requête ouverte (long-poll) jusqu'à
+# l'arrivée de nouvelles instructions ou l'expiration du délai
+async def recuperer_instruction(robot_id=ROBOT_ID, attente=0):
     try:
-        res = urequests.get(url)
-        if res.status_code == 200:
-            data = res.json()
+        code, reponse = await client_instructions.requete(
+            b"GET", f"/instructions?robot_id={robot_id}&wait={attente}".encode(), delai=attente + 5
+        )
+        if code == 200:
+            data = json.loads(reponse)
             print("📥 Instruction reçue :", data)
-            res.close()
             return data
         else:
-            print("⚠️ Mauvaise réponse :", res.status_code)
+            print("⚠️ Mauvaise réponse :", code)
     except Exception as e:
         print("❌ Erreur GET :", e)
     return None
 
 # ➤ Send mission summary
-def envoyer_summary(robot_id="255f30bc-46f7-41d4-ba1d-db76a0afd7f7"):
-    url = "http://10.7.5.119:8000/summary"
+async def envoyer_summary(robot_id=ROBOT_ID, vitesse_moyenne=0.0):
     data = {
-        "robot_id": robot_id
+        "robot_id": robot_id,
+        "average_speed": vitesse_moyenne
     }
     try:
-        res = urequests.post(url, json=data)
-        print("✅ Résumé de mission envoyé :", res.status_code)
-        res.close()
+        code, _ = await client_donnees.requete(b"POST", CHEMIN_SUMMARY, json.dumps(data).encode())
+        print("✅ Résumé de mission envoyé :", code)
     except Exception as e:
         print("❌ Erreur envoi résumé :", e)
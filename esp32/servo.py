@@ -1,26 +1,62 @@
 from machine import Pin, PWM
 from time import sleep
+from array import array
 
 class Servo:
-    def __init__(self, pin, freq=50, min_us=500, max_us=2500, max_angle=180):
+    # Duty values for every whole degree are computed once here; set_angle()
+    # is a table lookup. move_to()/update() sweep towards a target angle by at
+    # most `step` degrees per update.
+    def __init__(self, pin, freq=50, min_us=500, max_us=2500, max_angle=180, step=3):
         self.pwm = PWM(Pin(pin), freq=freq)
         self.min_us = min_us
         self.max_us = max_us
         self.max_angle = max_angle
         self.freq = freq
+        self.step = step
+        self.duty_table = array('H', (self._compute_duty(angle) for angle in range(max_angle + 1)))
+        self.angle = None   # unknown until the first command
+        self.target = None
 
-    def set_angle(self, angle):
-        if angle < 0:
-            angle = 0
-        elif angle > self.max_angle:
-            angle = self.max_angle
-
+    def _compute_duty(self, angle):
         # Calculate pulse width in microseconds
         us = self.min_us + (self.max_us - self.min_us) * angle / self.max_angle
 
         # Convert us to duty for ESP32: duty = us / 1000000 * freq * 1023
-        duty = int(us * self.freq * 1023 / 1000000)
-        self.pwm.duty(duty)
+        return int(us * self.freq * 1023 / 1000000)
+
+    def _clamp(self, angle):
+        angle = int(angle)
+        if angle < 0:
+            return 0
+        if angle > self.max_angle:
+            return self.max_angle
+        return angle
+
+    def set_angle(self, angle):
+        angle = self._clamp(angle)
+        self.pwm.duty(self.duty_table[angle])
+        self.angle = self.target = angle
+
+    def move_to(self, angle):
+        # Target angle reached progressively by update(); jumps if position is unknown
+        if self.angle is None:
+            self.set_angle(angle)
+        else:
+            self.target = self._clamp(angle)
+
+    def update(self):
+        # Call once per control tick; returns True once the target is reached
+        angle = self.angle
+        target = self.target
+        if angle == target:
+            return True
+        if target > angle:
+            angle = min(angle + self.step, target)
+        else:
+            angle = max(angle - self.step, target)
+        self.pwm.duty(self.duty_table[angle])
+        self.angle = angle
+        return angle == target
 
     def deinit(self):
         self.pwm.deinit()
@@ -0,0 +1,115 @@
+import struct
+import _thread
+from time import ticks_ms
+
+# Format binaire attendu par POST /telemetry/packed (voir api/telemetry_format.py)
+# Entête : magic, version, (pad), ticks_ms au moment de l'envoi
+ENTETE = "<2sBxI"
+# Enregistrement : slot robot, ligne, drapeaux, vitesse x100, distance mm, ticks_ms
+ENREGISTREMENT = "<HBBhHI"
+TAILLE_ENTETE = struct.calcsize(ENTETE)
+TAILLE_ENREGISTREMENT = struct.calcsize(ENREGISTREMENT)
+
+MAGIC = b"TL"
+VERSION = 1
+EN_MOUVEMENT = 0x01
+PINCE_FERMEE = 0x02
+SANS_DISTANCE = 0xFFFF
+
+
+def encoder_enregistrement(tampon, position, slot, ligne, vitesse, distance,
+                           en_mouvement, pince_fermee, instant):
+    # Écrit un enregistrement de 12 octets dans tampon, sans allocation
+    drapeaux = (EN_MOUVEMENT if en_mouvement else 0) | (PINCE_FERMEE if pince_fermee else 0)
+    if distance is None or distance < 0:
+        distance_mm = SANS_DISTANCE
+    else:
+        distance_mm = min(int(distance * 10), SANS_DISTANCE - 1)
+    vitesse = max(-32768, min(32767, int(vitesse * 100)))
+    struct.pack_into(ENREGISTREMENT, tampon, position, slot, ligne & 0xFF,
+                     drapeaux, vitesse, distance_mm, instant)
+
+
+class EncodeurTelemetrie:
+    # Tampon préalloué : entête + jusqu'à `capacite` enregistrements
+    def __init__(self, slot, capacite=32):
+        self.slot = slot
+        self.capacite = capacite
+        self.tampon = bytearray(TAILLE_ENTETE + capacite * TAILLE_ENREGISTREMENT)
+        self.vue = memoryview(self.tampon)
+        self.nombre = 0
+
+    def ajouter(self, ligne, vitesse, distance, en_mouvement, pince_fermee):
+        # Retourne False si le tampon est plein (l'échantillon n'est pas ajouté)
+        if self.nombre >= self.capacite:
+            return False
+        position = TAILLE_ENTETE + self.nombre * TAILLE_ENREGISTREMENT
+        encoder_enregistrement(self.tampon, position, self.slot, ligne, vitesse,
+                               distance, en_mouvement, pince_fermee, ticks_ms())
+        self.nombre += 1
+        return True
+
+    def paquet(self):
+        # Vue (sans copie) sur l'entête et les enregistrements en attente
+        struct.pack_into(ENTETE, self.tampon, 0, MAGIC, VERSION, ticks_ms())
+        return self.vue[:TAILLE_ENTETE + self.nombre * TAILLE_ENREGISTREMENT]
+
+    def vider(self):
+        self.nombre = 0
+
+
+class TamponTelemetrie:
+    # Anneau préalloué de `capacite` enregistrements, rempli par la boucle de
+    # contrôle et vidé par lots de `lot` par la tâche réseau. Quand il est
+    # plein, l'enregistrement le plus ancien est écrasé (on garde le récent).
+    # Les compteurs ecrits/lus ne font qu'augmenter ; l'index dans l'anneau
+    # est compteur % capacite.
+    def __init__(self, slot, capacite=256, lot=32):
+        self.capacite = capacite
+        self.anneau = bytearray(capacite * TAILLE_ENREGISTREMENT)
+        self.vue = memoryview(self.anneau)
+        self.envoi = EncodeurTelemetrie(slot, lot)
+        self.slot = slot
+        self.ecrits = 0
+        self.lus = 0
+        self.perdus = 0
+        self.verrou = _thread.allocate_lock()
+
+    def en_attente(self):
+        return self.ecrits - self.lus
+
+    def enregistrer(self, ligne, vitesse, distance, en_mouvement, pince_fermee):
+        # Appelé depuis la boucle de contrôle : aucune allocation, aucun réseau
+        instant = ticks_ms()
+        with self.verrou:
+            if self.ecrits - self.lus >= self.capacite:
+                self.lus += 1
+                self.perdus += 1
+            position = (self.ecrits % self.capacite) * TAILLE_ENREGISTREMENT
+            encoder_enregistrement(self.anneau, position, self.slot, ligne, vitesse,
+                                   distance, en_mouvement, pince_fermee, instant)
+            self.ecrits += 1
+
+    def preparer_lot(self):
+        # Copie les plus anciens enregistrements dans le tampon d'envoi.
+        # Retourne (debut, nombre, paquet) ; rien n'est retiré de l'anneau
+        # avant confirmer_lot(), pour pouvoir réessayer après un échec.
+        envoi = self.envoi
+        t = TAILLE_ENREGISTREMENT
+        with self.verrou:
+            debut = self.lus
+            nombre = min(self.ecrits - debut, envoi.capacite)
+            # Au plus deux copies : jusqu'à la fin de l'anneau, puis depuis le début
+            premier = debut % self.capacite
+            n1 = min(nombre, self.capacite - premier)
+            envoi.vue[TAILLE_ENTETE:TAILLE_ENTETE + n1 * t] = self.vue[premier * t:(premier + n1) * t]
+            if nombre > n1:
+                envoi.vue[TAILLE_ENTETE + n1 * t:TAILLE_ENTETE + nombre * t] = self.vue[:(nombre - n1) * t]
+        envoi.nombre = nombre
+        return debut, nombre, envoi.paquet()
+
+    def confirmer_lot(self, debut, nombre):
+        # Les enregistrements écrasés pendant l'envoi ont déjà avancé `lus`
+        with self.verrou:
+            if self.lus < debut + nombre:
+                self.lus = debut + nombre
@@ -1,5 +1,6 @@
 from machine import Pin, time_pulse_us
-from time import sleep
+from time import sleep, sleep_us
+import asyncio
 
 class Ultrason:
     def __init__(self, trigger_pin, echo_pin, timeout_us=30000):
@@ -24,3 +25,17 @@ class Ultrason:
         # Distance in cm: speed of sound = 343 m/s = 0.0343 cm/us
         distance = (duration * 0.0343) / 2
         return round(distance, 2)
+
+    async def distance_cm_async(self):
+        # Same measurement, but yields to other tasks while the sensor settles.
+        # time_pulse_us still blocks for up to timeout_us while waiting for the echo.
+        self.trigger.off()
+        await asyncio.sleep_ms(2)
+        self.trigger.on()
+        sleep_us(10)
+        self.trigger.off()
+
+        duration = time_pulse_us(self.echo, 1, self.timeout_us)
+        if duration < 0:
+            return -1
+        return round((duration * 0.0343) / 2, 2)
@@ -3,6 +3,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from database import init_db
 from api.routes import api_router
+from api.metrics import MetricsMiddleware
 import logging
 
 # Configure logging
@@ -19,6 +20,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-route request counts and latency, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -0,0 +1,261 @@
+"""Benchmarks for the API and database hot paths.
+
+Runs the FastAPI app in-process (httpx ASGI transport, startup/shutdown
+hooks included) against a temporary ``robots.db``. The telemetry table is
+grown to each requested size in turn and every case is timed at each size.
+
+    python tools/benchmark.py run --sizes 1k,100k,10M --output bench.json
+    python tools/benchmark.py compare base.json bench.json --threshold 0.2
+
+``compare`` exits with status 1 when a case's median got slower than the
+baseline by more than the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from load_generator import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_ROBOTS = [f"BENCH-{i:02d}" for i in range(1, 11)]
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "min_ms": samples[0] * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+    }
+
+
+async def measure(fn: Callable[[], Awaitable], iterations: int, max_seconds: float,
+                  warmup: int = 3, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Time ``fn`` until ``iterations`` runs or ``max_seconds`` (at least 5 runs)"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        await fn()
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < iterations and (len(samples) < 5 or time.perf_counter() < deadline):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def grow_telemetry(db_path: str, target: int, chunk: int = 1_000_000) -> int:
+    """Insert synthetic telemetry until the table holds ``target`` rows"""
+    conn = sqlite3.connect(db_path)
+    try:
+        count = conn.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0]
+        while count < target:
+            n = min(chunk, target - count)
+            # Spread rows over the last 6 days so raw retention keeps them
+            conn.execute("""
+                WITH RECURSIVE seq(x) AS (SELECT 0 UNION ALL SELECT x + 1 FROM seq WHERE x + 1 < ?)
+                INSERT INTO telemetry (robot_id, speed, ultrasonic_distance, displacement_status,
+                                       current_line, gripper_state, time_stamp)
+                SELECT 'BENCH-' || printf('%02d', (x % 10) + 1), (x % 100) / 100.0, x % 200,
+                       CASE x % 3 WHEN 0 THEN 'STOP' ELSE 'MOVING' END, (x % 10) + 1,
+                       CASE x % 2 WHEN 0 THEN 'open' ELSE 'closed' END,
+                       datetime('now', '-' || ((? - x) % 518400) || ' seconds')
+                FROM seq
+            """, (n, target))
+            conn.commit()
+            count += n
+        return count
+    finally:
+        conn.close()
+
+
+def telemetry_payload(robot_id: str) -> dict:
+    return {
+        "robot_id": robot_id,
+        "vitesse": random.uniform(0, 1.0),
+        "distance_ultrasons": random.uniform(0, 100),
+        "statut_deplacement": "moving",
+        "ligne": random.randint(1, 10),
+        "statut_pince": random.choice(["open", "closed"]),
+    }
+
+
+async def run_cases(client: httpx.AsyncClient, iterations: int, max_seconds: float) -> Dict[str, dict]:
+    from database import aio
+    from api.routes import PARTIAL_SOURCES, partial_cache
+
+    robot = BENCH_ROBOTS[0]
+    results = {}
+
+    async def request(method, url, **kwargs):
+        resp = await client.request(method, url, **kwargs)
+        resp.raise_for_status()
+
+    async def case(name, fn, setup=None):
+        results[name] = await measure(fn, iterations, max_seconds, setup=setup)
+        print(f"  {name:<40}{results[name]['p50_ms']:>10.3f} ms p50")
+
+    await case("POST /telemetry",
+               lambda: request("POST", "/telemetry", json=telemetry_payload(robot)))
+    await case("GET /instructions",
+               lambda: request("GET", "/instructions", params={"robot_id": robot}))
+    await case("POST /summary",
+               lambda: request("POST", "/summary", json={"robot_id": BENCH_ROBOTS[1], "average_speed": 0.5}))
+    for name in list(PARTIAL_SOURCES) + ["robots"]:
+        await case(f"GET /partials/{name}", lambda: request("GET", f"/partials/{name}"))
+        await case(f"GET /partials/{name} (uncached)", lambda: request("GET", f"/partials/{name}"),
+                   setup=partial_cache.clear)
+
+    async def first_page():
+        return [row async for row in aio.iter_telemetry_page(robot, limit=100)]
+
+    batch = [(robot, 0.5, 10.0, "MOVING", 1, "open", None)] * 100
+    helpers = {
+        "get_all_robots": aio.get_all_robots,
+        "get_data_versions": aio.get_data_versions,
+        "get_robot_instructions": lambda: aio.get_robot_instructions(robot),
+        "get_robot_telemetry": lambda: aio.get_robot_telemetry(robot),
+        "get_robots_with_instructions": aio.get_robots_with_instructions,
+        "get_robots_with_telemetry": aio.get_robots_with_telemetry,
+        "get_robots_with_summary": aio.get_robots_with_summary,
+        "iter_telemetry_page": first_page,
+        "get_telemetry_rollups": lambda: aio.get_telemetry_rollups(robot),
+        "insert_telemetry_batch[100]": lambda: aio.insert_telemetry_batch(batch),
+    }
+    for name, fn in helpers.items():
+        await case(f"aio.{name}", fn)
+    return results
+
+
+async def run_benchmarks(sizes: List[int], iterations: int, max_seconds: float, workdir: str) -> dict:
+    # The app resolves data/, templates/ and static/ against the working directory
+    os.makedirs(os.path.join(workdir, "data"))
+    for name in ("templates", "static"):
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    # Keep the background retention job from touching the synthetic rows
+    os.environ.setdefault("TELEMETRY_RAW_RETENTION_DAYS", "36500")
+    os.environ.setdefault("TELEMETRY_RETENTION_INTERVAL", "86400")
+
+    from main import app
+    from database import aio, DB_PATH
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        for robot_id in BENCH_ROBOTS:
+            await aio.insert_robot(robot_id, robot_id)
+        await aio.insert_instruction(BENCH_ROBOTS[0], [1, 4, 7])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size in sizes:
+                start = time.perf_counter()
+                rows = await asyncio.to_thread(grow_telemetry, DB_PATH, size)
+                print(f"telemetry rows: {rows} (grown in {time.perf_counter() - start:.1f}s)")
+                results[str(size)] = await run_cases(client, iterations, max_seconds)
+    return results
+
+
+def run(args):
+    sizes = sorted(parse_size(s) for s in args.sizes.split(","))
+    workdir = tempfile.mkdtemp(prefix="robots-bench-")
+    cwd = os.getcwd()
+    try:
+        results = asyncio.run(run_benchmarks(sizes, args.iterations, args.max_seconds, workdir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'size':>10}  {'case':<40}{'base ms':>10}{'new ms':>10}{'change':>9}")
+    for size, cases in current.items():
+        for name, stats in cases.items():
+            old = baseline.get(size, {}).get(name)
+            if old is None:
+                continue
+            before, after = old[args.metric], stats[args.metric]
+            change = (after - before) / before if before else 0.0
+            # Sub-50µs differences are timer noise, whatever the ratio
+            regressed = change > args.threshold and after - before > args.min_delta_ms
+            regressions += regressed
+            print(f"{size:>10}  {name:<40}{before:>10.3f}{after:>10.3f}{change:>+9.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%} on {args.metric}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the robot control API and database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", default="1k,100k", help="telemetry table sizes, e.g. 1k,100k,10M")
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--max-seconds", type=float, default=5,
+                            help="time budget per case and size")
+    run_parser.add_argument("--output", default="benchmark.json")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="relative slowdown flagged as a regression")
+    compare_parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "mean_ms", "min_ms"])
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.05)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
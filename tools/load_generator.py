@@ -0,0 +1,259 @@
+"""Drive many simulated robots against the API at once.
+
+Asyncio port of ``archive/robot_simulator.RobotSimulator``: each virtual
+robot waits for instructions, sends telemetry for every line of its mission
+and posts a summary, all through one shared ``httpx.AsyncClient`` connection
+pool. At the end a per-endpoint report gives throughput, error rate and
+p50/p95/p99 latency.
+
+    python tools/load_generator.py --robots 200 --duration 60 --telemetry-rate 2
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from statistics import mean
+from typing import Dict, List, Optional
+
+import httpx
+
+# Telemetry posts per second per robot
+DEFAULT_TELEMETRY_RATE = 1.0
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+
+class LoadStats:
+    """Latency samples and outcomes, grouped by endpoint name"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.missions = 0
+
+    def record(self, endpoint: str, seconds: float, status: str, ok: bool):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.record(seconds, status, ok)
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        report = {}
+        for endpoint, stats in sorted(self.endpoints.items()):
+            latencies = sorted(stats.latencies)
+            count = len(latencies)
+            report[endpoint] = {
+                "requests": count,
+                "errors": stats.errors,
+                "error_rate": stats.errors / count if count else 0.0,
+                "throughput": count / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "statuses": stats.statuses,
+            }
+        return report
+
+
+class AsyncRobotSimulator:
+    def __init__(self, robot_id: str, client: httpx.AsyncClient, stats: LoadStats,
+                 telemetry_rate: float = DEFAULT_TELEMETRY_RATE, lines: int = 13, long_poll: float = 30,
+                 poll_interval: float = 5):
+        self.robot_id = robot_id
+        self.client = client
+        self.stats = stats
+        if telemetry_rate <= 0:
+            raise ValueError(f"telemetry_rate must be positive, got {telemetry_rate}")
+        self.telemetry_interval = 1 / telemetry_rate
+        self.lines = lines
+        self.long_poll = long_poll
+        self.poll_interval = poll_interval
+        self.current_line = 1
+        self.speeds: List[float] = []
+        self.blocks: List[int] = []
+
+    async def _request(self, endpoint: str, method: str, url: str,
+                       timeout: float = 10, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record its latency under ``endpoint``"""
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(endpoint, time.perf_counter() - start, type(e).__name__, False)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, str(resp.status_code),
+                          resp.is_success)
+        return resp
+
+    async def wait_for_instruction(self, deadline: float) -> bool:
+        """Long-poll /instructions until blocks arrive or the run ends"""
+        while time.monotonic() < deadline:
+            wait = min(self.long_poll, max(0.0, deadline - time.monotonic()))
+            resp = await self._request(
+                "GET /instructions", "GET", "/instructions",
+                params={"robot_id": self.robot_id, "wait": round(wait, 1)},
+                timeout=wait + 5,
+            )
+            if resp is not None and resp.is_success:
+                blocks = resp.json().get("blocks", [])
+                if blocks:
+                    self.blocks = blocks
+                    return True
+                if wait:
+                    continue
+            await asyncio.sleep(self.poll_interval)
+        return False
+
+    async def send_telemetry(self):
+        speed = random.uniform(0, 1.0)
+        self.speeds.append(speed)
+        await self._request("POST /telemetry", "POST", "/telemetry", json={
+            "robot_id": self.robot_id,
+            "vitesse": speed,
+            "distance_ultrasons": random.uniform(0, 100),
+            "statut_deplacement": "moving",
+            "ligne": self.current_line,
+            "statut_pince": random.choice(["open", "closed"])
+        })
+
+    async def send_summary(self):
+        if not self.speeds:
+            return
+        await self._request("POST /summary", "POST", "/summary", json={
+            "robot_id": self.robot_id,
+            "average_speed": mean(self.speeds)
+        })
+
+    async def create_instruction(self):
+        """Act as the operator: queue a random mission for this robot"""
+        await self._request("POST /instructions/create", "POST", "/instructions/create", json={
+            "robot_id": self.robot_id,
+            "blocks": random.sample(range(1, 11), 3)
+        })
+
+    async def run(self, deadline: float, create_instructions: bool = True):
+        # Spread the robots over the first telemetry interval
+        await asyncio.sleep(random.uniform(0, self.telemetry_interval))
+        while time.monotonic() < deadline:
+            if create_instructions:
+                await self.create_instruction()
+            if not await self.wait_for_instruction(deadline):
+                return
+            self.current_line = 1
+            self.speeds = []
+            next_send = time.monotonic()
+            while self.current_line <= self.lines and time.monotonic() < deadline:
+                await self.send_telemetry()
+                self.current_line += 1
+                next_send += self.telemetry_interval
+                await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+            await self.send_summary()
+            self.stats.missions += 1
+
+
+async def ensure_robots(client: httpx.AsyncClient, robot_ids: List[str]):
+    """Register the virtual robots that the server does not know yet"""
+    resp = await client.get("/robots/list")
+    resp.raise_for_status()
+    known = {robot["id"] for robot in resp.json()}
+    for robot_id in robot_ids:
+        if robot_id not in known:
+            resp = await client.post("/robots", data={"robot_id": robot_id, "name": robot_id},
+                                     follow_redirects=False)
+            if resp.status_code >= 400:
+                resp.raise_for_status()
+
+
+async def run_load(base_url: str, robots: int, duration: float, telemetry_rate: float,
+                   lines: int, long_poll: float, poll_interval: float, create_instructions: bool,
+                   max_connections: int, prefix: str = "LOAD") -> dict:
+    robot_ids = [f"{prefix}-{i:04d}" for i in range(1, robots + 1)]
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    stats = LoadStats()
+    async with httpx.AsyncClient(base_url=base_url.rstrip("/"), limits=limits,
+                                 timeout=httpx.Timeout(10, pool=None)) as client:
+        await ensure_robots(client, robot_ids)
+        simulators = [
+            AsyncRobotSimulator(robot_id, client, stats, telemetry_rate, lines, long_poll, poll_interval)
+            for robot_id in robot_ids
+        ]
+        start = time.monotonic()
+        deadline = start + duration
+        await asyncio.gather(*(sim.run(deadline, create_instructions) for sim in simulators))
+        elapsed = time.monotonic() - start
+    return {
+        "robots": robots,
+        "duration_s": elapsed,
+        "missions": stats.missions,
+        "endpoints": stats.report(elapsed),
+    }
+
+
+def print_report(result: dict):
+    print(f"{result['robots']} robots, {result['duration_s']:.1f}s, "
+          f"{result['missions']} missions completed")
+    print(f"{'endpoint':<28}{'requests':>9}{'req/s':>9}{'errors':>8}{'err %':>7}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, row in result["endpoints"].items():
+        print(f"{endpoint:<28}{row['requests']:>9}{row['throughput']:>9.1f}{row['errors']:>8}"
+              f"{row['error_rate'] * 100:>7.2f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}")
+
+
+def positive_float(value: str) -> float:
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run N virtual robots against the robot control API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--robots", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--telemetry-rate", type=positive_float, default=DEFAULT_TELEMETRY_RATE,
+                        help="telemetry posts per second per robot")
+    parser.add_argument("--lines", type=int, default=13, help="telemetry posts per mission")
+    parser.add_argument("--long-poll", type=float, default=30,
+                        help="instruction long-poll wait, 0 for plain polling")
+    parser.add_argument("--poll-interval", type=float, default=5)
+    parser.add_argument("--no-create-instructions", action="store_true",
+                        help="wait for instructions created by someone else")
+    parser.add_argument("--max-connections", type=int, default=100,
+                        help="size of the shared connection pool")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(
+        args.base_url, args.robots, args.duration, args.telemetry_rate, args.lines,
+        args.long_poll, args.poll_interval, not args.no_create_instructions, args.max_connections
+    ))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()